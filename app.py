@@ -1,24 +1,27 @@
 from pathlib import Path
 import logging
+import threading
 from flask import Flask, request, jsonify
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, emit
 from dotenv import load_dotenv
 
+# Load environment variables before the modules read their settings at import
+load_dotenv()
+
 # Local blueprints and fetch functions
-from modules.icloud_module import icloud_bp, get_icloud_data
-from modules.weather_module import weather_bp, get_weather
-from modules.time_module import time_bp, get_time
-from modules.network_module import network_bp, get_network
-from modules.lighting_module import lighting_bp, get_lighting
-from modules.sun_module import sun_bp, get_sun
-from modules.meals_module import meals_bp, recipes_bp, mealslot_bp
+from modules.icloud_module import icloud_bp, icloud_payload, subscribe as subscribe_icloud
+from modules.weather_module import weather_bp, weather_payload
+from modules.time_module import time_bp, time_payload, time_sync_payload, seconds_until_minute
+from modules.network_module import network_bp, network_payload
+from modules.lighting_module import lighting_bp, lighting_payload
+from modules.sun_module import sun_bp, sun_payload, seconds_until_transition
+from modules.meals_module import MEALS_STORE, meals_bp, recipes_bp, mealslot_bp, meal_changes, snapshot_meals
 from modules.worldclock_module import worldclock_bp
+from modules.scheduler import Scheduler, structural_hash
+from modules.delta import DeltaChannel
 
 import os
 
-# Load environment variables
-load_dotenv()
-
 print("iCloud username:", os.getenv("ICLOUD_USERNAME"))
 print("iCloud password:", os.getenv("ICLOUD_PASSWORD"))
 
@@ -49,30 +52,83 @@ app.register_blueprint(mealslot_bp)
 app.register_blueprint(worldclock_bp)
 
 
+# Single scheduler that owns every background data source
+scheduler = Scheduler(sleep=socketio.sleep)
+# Versioned iCloud snapshot; clients receive uid-keyed patches against it
+icloud_channel = DeltaChannel(keyed=("events", "today"))
+
+
+def publish_meal_changes(batch):
+    """Pushes each committed meal/recipe write to every connected display."""
+    payload = meal_changes(batch)
+    if payload is not None:
+        socketio.emit("meals_patch", payload)
+
+
+MEALS_STORE.subscribe(publish_meal_changes)
+
+
 # Background task to poll data sources and emit updates
 def start_background_tasks():
-    def fetch_event(event_name, func, interval):
+    def fetch_event(event_name, producer):
         prev = None
-        while True:
-            # Execute within Flask application context for jsonify
-            with app.app_context():
-                resp = func()
-            try:
-                data = resp.get_json()["data"]
-            except Exception:
-                data = None
-            if data != prev:
+
+        def job():
+            nonlocal prev
+            # Producers return plain dicts; compare hashes instead of payloads
+            data = producer()
+            digest = structural_hash(data)
+            if digest != prev:
                 socketio.emit(event_name, data)
-                prev = data
-            socketio.sleep(interval)
+                prev = digest
 
-    # start tasks
-    socketio.start_background_task(fetch_event, "weather_update", get_weather, 600)
-    socketio.start_background_task(fetch_event, "time_update", get_time, 1)
-    socketio.start_background_task(fetch_event, "network_update", get_network, 10)
-    socketio.start_background_task(fetch_event, "lighting_update", get_lighting, 1)
-    socketio.start_background_task(fetch_event, "sun_update", get_sun, 60)
-    socketio.start_background_task(fetch_event, "icloud_update", get_icloud_data, 300)
+        return job
+
+    def delta_event(event_name, patch_name, producer, channel):
+        def job():
+            base = channel.version
+            ops = channel.update(producer())
+            if ops is None:
+                socketio.emit(event_name, channel.snapshot())
+            elif ops:
+                socketio.emit(patch_name, {"base": base, "version": channel.version, "ops": ops})
+
+        return job
+
+    # register sources; 1 s sources share a wakeup, slow ones get jitter
+    scheduler.add("weather_update", fetch_event("weather_update", weather_payload), 600, jitter=30)
+    # Clients tick seconds locally; the server only pushes each new minute
+    scheduler.add("time_update", fetch_event("time_update", time_payload), 60, next_run=seconds_until_minute)
+    scheduler.add("network_update", fetch_event("network_update", network_payload), 10)
+    scheduler.add("lighting_update", fetch_event("lighting_update", lighting_payload), 1)
+    # Runs at each dawn/sunrise/sunset/dusk and at midnight instead of polling
+    scheduler.add("sun_update", fetch_event("sun_update", sun_payload), 600, next_run=seconds_until_transition)
+    icloud_job = delta_event("icloud_update", "icloud_patch", icloud_payload, icloud_channel)
+    icloud_lock = threading.Lock()
+
+    def publish_icloud():
+        with icloud_lock:
+            icloud_job()
+
+    # Refreshes finish on the iCloud workers; push each one as it lands
+    subscribe_icloud(publish_icloud)
+    scheduler.add("icloud_update", publish_icloud, 300, jitter=15)
+    # Group-commits meal edits into one JSON snapshot write per interval
+    scheduler.add("meals_snapshot", snapshot_meals, 30)
+    socketio.start_background_task(scheduler.run_forever)
+
+
+# NTP-style clock sync: the ack carries the server clock for the client's offset estimate
+@socketio.on("time_sync")
+def time_sync(msg=None):
+    return {"t0": (msg or {}).get("t0"), **time_sync_payload()}
+
+
+# Client's iCloud version is stale (missed or out-of-order patch): send full snapshot
+@socketio.on("icloud_resync")
+def icloud_resync(msg=None):
+    if icloud_channel.data is not None:
+        emit("icloud_update", icloud_channel.snapshot())
 
 
 # Serve dashboard
@@ -87,14 +143,20 @@ def reload_data():
     # restrict to local network
     if request.remote_addr not in ("127.0.0.1", "::1"):
         return "", 403
-    from modules.weather_module import _WEATHER_CACHE
+    from modules.weather_module import invalidate_weather
     from modules.icloud_module import _ICLOUD_CACHE
 
-    _WEATHER_CACHE.clear()
+    invalidate_weather()
     _ICLOUD_CACHE.clear()
     return jsonify({"status": "ok"})
 
 
+# Per-source run counts and durations of the background scheduler
+@app.route("/api/scheduler/stats")
+def scheduler_stats():
+    return jsonify({"status": "ok", "data": scheduler.stats()})
+
+
 if __name__ == "__main__":
     # start polling background tasks before running
     start_background_tasks()
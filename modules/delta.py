@@ -0,0 +1,89 @@
+import time
+
+from modules.scheduler import structural_hash
+
+
+def _pointer(*parts):
+    # JSON pointer escaping (RFC 6901)
+    return "".join("/" + str(p).replace("~", "~0").replace("/", "~1") for p in parts)
+
+
+def _index_by_uid(items):
+    """Map uid -> item, or None if any item lacks a uid or uids collide."""
+    index = {}
+    for item in items:
+        uid = item.get("uid") if isinstance(item, dict) else None
+        if not uid or uid in index:
+            return None
+        index[uid] = item
+    return index
+
+
+def diff_payload(old, new, keyed=()):
+    """
+    Returns JSON-patch style ops turning ``old`` into ``new``.
+
+    Top-level fields are replaced wholesale, except the list fields named in
+    ``keyed`` which are diffed item by item using each item's ``uid``; their
+    paths look like ``/events/<uid>``.
+    """
+    ops = []
+    for field in old:
+        if field not in new:
+            ops.append({"op": "remove", "path": _pointer(field)})
+    for field, value in new.items():
+        prev = old.get(field)
+        if field in old and structural_hash(prev) == structural_hash(value):
+            continue
+        if field in keyed and isinstance(prev, list) and isinstance(value, list):
+            old_index = _index_by_uid(prev)
+            new_index = _index_by_uid(value)
+            if old_index is not None and new_index is not None:
+                for uid in old_index:
+                    if uid not in new_index:
+                        ops.append({"op": "remove", "path": _pointer(field, uid)})
+                for uid, item in new_index.items():
+                    if uid not in old_index:
+                        ops.append({"op": "add", "path": _pointer(field, uid), "value": item})
+                    elif structural_hash(old_index[uid]) != structural_hash(item):
+                        ops.append({"op": "replace", "path": _pointer(field, uid), "value": item})
+                continue
+        ops.append({"op": "add" if field not in old else "replace", "path": _pointer(field), "value": value})
+    return ops
+
+
+class DeltaChannel:
+    """
+    Last snapshot of one push source with a version counter.
+
+    Versions start from the boot time in milliseconds, so a client holding a
+    version from before a restart never matches a patch base by accident.
+    """
+
+    def __init__(self, keyed=()):
+        self.keyed = keyed
+        self.version = int(time.time() * 1000)
+        self.data = None
+        self._digest = None
+
+    def update(self, data):
+        """
+        Stores ``data`` as the new snapshot.
+
+        Returns ``[]`` when nothing changed, a list of patch ops against the
+        previous version, or None when only a full snapshot makes sense.
+        """
+        digest = structural_hash(data)
+        if self._digest is not None and digest == self._digest:
+            return []
+        if isinstance(self.data, dict) and isinstance(data, dict):
+            ops = diff_payload(self.data, data, self.keyed)
+        else:
+            ops = None
+        self.data = data
+        self._digest = digest
+        self.version += 1
+        return ops
+
+    def snapshot(self):
+        return {"version": self.version, "data": self.data}
@@ -2,7 +2,9 @@ import os
 import time
 import random
 import logging
-from flask import Blueprint, jsonify, request
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import Blueprint, jsonify, request, send_from_directory
 from pyicloud import PyiCloudService
 # Fallback to pyicloud-ipd fork if needed
 try:
@@ -11,11 +13,35 @@ except ImportError:
     IPDService = None
 from pathlib import Path
 
+from modules.icloud_sync import CalendarSync
+from modules.photo_cache import PhotoCache
+from modules.storage import CACHE_DIR
+
 icloud_bp = Blueprint("icloud", __name__, url_prefix="/api/icloud")
 
 # Cache structure
 _ICLOUD_CACHE = {}
 _TTL = 300  # seconds
+# Rolling-window calendar store; only changed calendars/events are re-processed
+_CALENDAR_SYNC = CalendarSync()
+# pyicloud is synchronous, so refreshes run on one worker thread off the request path
+_REFRESH_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="icloud")
+_REFRESH_LOCK = threading.Lock()
+_REFRESH_FUTURE = None
+# Sub-fetches fan out on a bounded pool; each section keeps its last good value
+_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="icloud-fetch")
+_SECTION_TIMEOUTS = {"calendars": 20, "events": 40, "reminders": 20, "photo": 30}  # seconds
+_SECTIONS = {}
+_SECTION_FUTURES = {}
+_SECTION_LOCK = threading.Lock()
+# False while a refresh is still waiting on its sections; it publishes them itself
+_COLLECTED = True
+_LISTENERS = []
+# Shared-album photos, downscaled for the panel and served locally
+_PHOTO_CACHE = PhotoCache(
+    CACHE_DIR / "photos",
+    size=(int(os.getenv("PHOTO_MAX_WIDTH", 800)), int(os.getenv("PHOTO_MAX_HEIGHT", 480))),
+)
 
 # Add global api instance and 2FA flag
 _ICLOUD_API = None
@@ -101,8 +127,168 @@ def verify_icloud():
         return jsonify({"status": "invalid_code"}), 401
 
 
-@icloud_bp.route("/data")
-def get_icloud_data():
+def _fetch_calendars():
+    # Calendar collections carry the ctags used for incremental sync
+    return list(_ICLOUD_API.calendar.calendars())
+
+
+def _fetch_events(calendars_future):
+    try:
+        raw_calendars = calendars_future.result(timeout=_SECTION_TIMEOUTS["calendars"])
+    except Exception:
+        raw_calendars = []
+    # Fetch events in the visible window, merging only what changed
+    return _CALENDAR_SYNC.sync(_ICLOUD_API, raw_calendars)
+
+
+def _fetch_reminders():
+    # Fetch reminders for "Today" list
+    reminders = []
+    for reminder in _ICLOUD_API.reminders.get():
+        reminders.append({
+            "uid": reminder.get("guid"),
+            "title": reminder.get("title"),
+            "dueDate": reminder.get("dueDate"),
+            "priority": reminder.get("priority"),
+            "done": reminder.get("completed", False),
+        })
+    return reminders
+
+
+def _fetch_photo():
+    album_name = os.getenv("ICLOUD_SHARED_ALBUM")
+    if not album_name:
+        return None
+    # Re-list the shared album only when the local cache is due for a sync
+    if _PHOTO_CACHE.needs_listing():
+        albums = _ICLOUD_API.photos.albums
+        album = next((a for a in albums if a.get("title") == album_name), None)
+        if album:
+            _PHOTO_CACHE.sync(_ICLOUD_API.photos.get_shared_album(album.get("dsid")))
+    name = _PHOTO_CACHE.next_photo()
+    return f"/api/icloud/photo/{name}" if name else None
+
+
+def _store_section(name, future):
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logging.error(f"Error fetching iCloud {name}", exc_info=exc)
+        return
+    with _SECTION_LOCK:
+        _SECTIONS[name] = future.result()
+        late = _COLLECTED
+    # A section that finished after its timeout still lands in the payload
+    if late and "data" in _ICLOUD_CACHE:
+        _publish()
+
+
+def _submit_section(name, fn, *args):
+    """Starts a section fetch unless the previous one for it is still running."""
+    future = _SECTION_FUTURES.get(name)
+    if future is None or future.done():
+        future = _FETCH_EXECUTOR.submit(fn, *args)
+        _SECTION_FUTURES[name] = future
+        future.add_done_callback(lambda f: _store_section(name, f))
+    return future
+
+
+def _calendar_names(raw_calendars):
+    calendars = []
+    try:
+        for cal in raw_calendars:
+            logging.info(f"iCloud calendar object: {cal}")
+            name = cal.get("Title") or cal.get("title") or cal.get("name")
+            if not name:
+                name = str(cal)
+            calendars.append(name)
+    except Exception:
+        logging.exception("Error extracting calendar names")
+    return calendars
+
+
+def subscribe(listener):
+    """Calls ``listener()`` whenever a refreshed payload is published."""
+    _LISTENERS.append(listener)
+
+
+def _publish():
+    """Builds the payload from the last good value of every section."""
+    _ICLOUD_CACHE["data"] = {
+        "user": getattr(_ICLOUD_API, "username", None),
+        "calendars": _calendar_names(_SECTIONS.get("calendars", [])),
+        "events": _SECTIONS.get("events", []),
+        "today": _SECTIONS.get("reminders", []),
+        "tasks": [],
+        "shopping": [],
+        "chores": [],
+        "photo": _SECTIONS.get("photo"),
+    }
+    for listener in _LISTENERS:
+        try:
+            listener()
+        except Exception:
+            logging.exception("Error in iCloud listener")
+
+
+def _refresh_icloud():
+    """
+    Fans out the calendar, event, reminder and photo fetches on the fetch
+    pool and publishes whatever finished within each section's timeout.
+    Sections that fail or time out keep their last good value.
+    """
+    global _COLLECTED
+    now = time.time()
+    started = time.monotonic()
+    with _SECTION_LOCK:
+        _COLLECTED = False
+    calendars_future = _submit_section("calendars", _fetch_calendars)
+    futures = {
+        "calendars": calendars_future,
+        "events": _submit_section("events", _fetch_events, calendars_future),
+        "reminders": _submit_section("reminders", _fetch_reminders),
+        "photo": _submit_section("photo", _fetch_photo),
+    }
+    for name, future in futures.items():
+        remaining = max(started + _SECTION_TIMEOUTS[name] - time.monotonic(), 0)
+        try:
+            future.result(timeout=remaining)
+        except TimeoutError:
+            logging.warning(f"iCloud {name} fetch timed out; keeping last good value")
+        except Exception:
+            pass  # logged by _store_section
+    with _SECTION_LOCK:
+        # Sections stored so far are in this publish; later ones publish themselves
+        _COLLECTED = True
+    _ICLOUD_CACHE["timestamp"] = now
+    _publish()
+
+
+def _run_refresh():
+    try:
+        _refresh_icloud()
+    except Exception:
+        logging.exception("Error fetching iCloud data")
+        raise
+
+
+def _start_refresh():
+    """
+    Single-flight: returns the in-flight refresh future, starting one on the
+    worker thread if none is running. Concurrent callers share the same one.
+    """
+    global _REFRESH_FUTURE
+    with _REFRESH_LOCK:
+        if _REFRESH_FUTURE is None or _REFRESH_FUTURE.done():
+            _REFRESH_FUTURE = _REFRESH_EXECUTOR.submit(_run_refresh)
+        return _REFRESH_FUTURE
+
+
+def icloud_payload():
+    """
+    Returns the calendar/reminders payload, or None while 2FA is pending.
+    """
     global _ICLOUD_API, DEV_STUB
     if DEV_MODE or DEV_STUB:
         # Generate stub events for the entire current month (6x7 grid)
@@ -118,6 +304,8 @@ def get_icloud_data():
         # 42 days for 6x7 grid
         days_in_grid = [grid_start + timedelta(days=i) for i in range(42)]
 
+        # Seeded per month so every tick yields the same events and uids
+        rng = random.Random(first_of_month.strftime("%Y-%m"))
         # Use a nice palette of distinct hues
         calendar_names = ["Work", "Family", "Birthdays", "Personal", "School", "Sports"]
         palette = [
@@ -130,36 +318,36 @@ def get_icloud_data():
             "#c2185b",  # pink
             "#6d4c41",  # brown
         ]
-        random.shuffle(palette)
+        rng.shuffle(palette)
         calendar_colors = {name: palette[i % len(palette)] for i, name in enumerate(calendar_names)}
         stub_events = []
         for day in days_in_grid:
-            num_events = random.randint(2, 5)
+            num_events = rng.randint(2, 5)
             event_slots = []  # Track (start, end) for overlap
             for e in range(num_events):
-                cal_idx = random.randint(0, len(calendar_names) - 1)
+                cal_idx = rng.randint(0, len(calendar_names) - 1)
                 cal_name = calendar_names[cal_idx]
                 color = calendar_colors[cal_name]
                 # 30% chance all-day event
-                if random.random() < 0.3:
+                if rng.random() < 0.3:
                     start_dt = day.replace(hour=0, minute=0, second=0, microsecond=0)
                     end_dt = start_dt + timedelta(days=1)
                 else:
-                    start_hour = random.randint(7, 17)
-                    start_minute = random.choice([0, 15, 30, 45])
-                    duration = random.choice([30, 45, 60, 90])
+                    start_hour = rng.randint(7, 17)
+                    start_minute = rng.choice([0, 15, 30, 45])
+                    duration = rng.choice([30, 45, 60, 90])
                     start_dt = day.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(hours=start_hour, minutes=start_minute)
                     end_dt = start_dt + timedelta(minutes=duration)
                     # Overlap: 1 in 2 events will overlap with a previous slot
-                    if event_slots and random.random() < 0.5:
-                        overlap_with = random.choice(event_slots)
-                        overlap_start = overlap_with[0] + timedelta(minutes=random.choice([10, 20, 30]))
-                        overlap_end = overlap_start + timedelta(minutes=random.choice([30, 45, 60]))
+                    if event_slots and rng.random() < 0.5:
+                        overlap_with = rng.choice(event_slots)
+                        overlap_start = overlap_with[0] + timedelta(minutes=rng.choice([10, 20, 30]))
+                        overlap_end = overlap_start + timedelta(minutes=rng.choice([30, 45, 60]))
                         start_dt, end_dt = overlap_start, overlap_end
                 event_slots.append((start_dt, end_dt))
                 attendees_list = []
-                if random.random() < 0.7:
-                    num_attendees = random.randint(1, 4)
+                if rng.random() < 0.7:
+                    num_attendees = rng.randint(1, 4)
                     possible_attendees = [
                         {"name": "Alice Wonderland", "email": "alice@example.com"},
                         {"name": "Bob The Builder", "email": "bob@example.com"},
@@ -168,28 +356,28 @@ def get_icloud_data():
                         {"name": "Edward Scissorhands", "email": "edward@example.com"},
                     ]
                     statuses = ["accepted", "declined", "tentative", "no-reply"]
-                    selected_attendees = random.sample(possible_attendees, min(num_attendees, len(possible_attendees)))
+                    selected_attendees = rng.sample(possible_attendees, min(num_attendees, len(possible_attendees)))
                     for att in selected_attendees:
                         attendees_list.append(
-                            {"name": att["name"], "email": att["email"], "status": random.choice(statuses)}
+                            {"name": att["name"], "email": att["email"], "status": rng.choice(statuses)}
                         )
                 stub_events.append(
                     {
-                        "uid": f"stub-event-{day.strftime('%Y%m%d')}-{e}-{random.randint(1000, 9999)}",
+                        "uid": f"stub-event-{day.strftime('%Y%m%d')}-{e}",
                         "title": f"{cal_name} Event {day.day}-{e + 1}",
                         "start": start_dt.isoformat(),
                         "end": end_dt.isoformat(),
                         "calendar": cal_name,
                         "color": color,
-                        "creator": random.choice(["John Doe", "Jane Smith", "System Generated"]),
-                        "notes": random.choice([
+                        "creator": rng.choice(["John Doe", "Jane Smith", "System Generated"]),
+                        "notes": rng.choice([
                             "Remember to bring the presentation.",
                             "Discuss Q3 budget.",
                             "Pick up dry cleaning on the way.",
                             "",
                             "This is a longer note that might contain multiple sentences. It's important to test how multi-line notes are displayed in the UI. Ensure that the layout handles this gracefully without breaking.",
                         ]),
-                        "location": random.choice([
+                        "location": rng.choice([
                             "Conference Room A",
                             "Online Meeting",
                             "Client's Office",
@@ -205,36 +393,42 @@ def get_icloud_data():
             "events": stub_events,
             "today": [
                 {
+                    "uid": "stub-reminder-1",
                     "title": "Book flight to Bali",
                     "dueDate": (today + timedelta(days=1)).date().isoformat(),
                     "priority": "high",
                     "done": False,
                 },
                 {
+                    "uid": "stub-reminder-2",
                     "title": "Call Mom for her birthday",
                     "dueDate": (today + timedelta(days=2)).date().isoformat(),
                     "priority": "medium",
                     "done": False,
                 },
                 {
+                    "uid": "stub-reminder-3",
                     "title": "Buy groceries for the week",
                     "dueDate": (today).date().isoformat(),
                     "priority": "high",
                     "done": False,
                 },
                 {
+                    "uid": "stub-reminder-4",
                     "title": "Finish project proposal",
                     "dueDate": (today + timedelta(days=3)).date().isoformat(),
                     "priority": "high",
                     "done": False,
                 },
                 {
+                    "uid": "stub-reminder-5",
                     "title": "Schedule dentist appointment",
                     "dueDate": (today + timedelta(days=5)).date().isoformat(),
                     "priority": "low",
                     "done": True,
                 },
                 {
+                    "uid": "stub-reminder-6",
                     "title": "Pay credit card bill",
                     "dueDate": (today - timedelta(days=1)).date().isoformat(),
                     "priority": "medium",
@@ -260,85 +454,27 @@ def get_icloud_data():
             ],
             "photo": None,
         }
-        return jsonify({"status": "ok", "data": stub_data})
+        return stub_data
     # If not initialized or 2FA pending
     if _ICLOUD_API is None or getattr(_ICLOUD_API, "requires_2fa", False):
-        return jsonify({"status": "2fa_required"})
+        return None
     # Stub when credentials not provided
     if not os.getenv("ICLOUD_USERNAME") or not os.getenv("ICLOUD_PASSWORD"):
-        return jsonify({
-            "status": "ok",
-            "data": {
-                "events": [],
-                "today": [],
-                "tasks": [],
-                "shopping": [],
-                "chores": [],
-                "photo": None,
-            },
-        })
+        return {
+            "events": [],
+            "today": [],
+            "tasks": [],
+            "shopping": [],
+            "chores": [],
+            "photo": None,
+        }
 
-    now = time.time()
-    try:
-        if "timestamp" not in _ICLOUD_CACHE or now - _ICLOUD_CACHE["timestamp"] > _TTL:
-            # Fetch events
-            events = []
-            for event in _ICLOUD_API.calendar.events():
-                events.append(
-                    {"title": event.get("title"), "start": event.get("startDate"), "end": event.get("endDate")}
-                )
-            # Fetch reminders for "Today" list
-            reminders = []
-            for reminder in _ICLOUD_API.reminders.get():
-                reminders.append({
-                    "title": reminder.get("title"),
-                    "dueDate": reminder.get("dueDate"),
-                    "priority": reminder.get("priority"),
-                    "done": reminder.get("completed", False),
-                })
-            # Fetch photos from shared album
-            photo_url = None
-            album_name = os.getenv("ICLOUD_SHARED_ALBUM")
-            if album_name:
-                # find album
-                albums = _ICLOUD_API.photos.albums
-                album = next((a for a in albums if a.get("title") == album_name), None)
-                if album:
-                    photos = _ICLOUD_API.photos.get_shared_album(album.get("dsid"))
-                    urls = [p.get("downloadUrl") for p in photos]
-                    if urls:
-                        photo_url = random.choice(urls)
-            # Determine signed-in user and calendar names
-            user = getattr(_ICLOUD_API, "username", None)
-            calendars = []
-            try:
-                for cal in _ICLOUD_API.calendar.calendars():
-                    logging.info(f"iCloud calendar object: {cal}")
-                    name = cal.get("Title") or cal.get("title") or cal.get("name")
-                    if not name:
-                        name = str(cal)
-                    calendars.append(name)
-            except Exception as e:
-                logging.exception("Error extracting calendar names")
-            # Update cache with new fields
-            _ICLOUD_CACHE.update(
-                {
-                    "timestamp": now,
-                    "data": {
-                        "user": user,
-                        "calendars": calendars,
-                        "events": events,
-                        "today": reminders,
-                        "tasks": [],
-                        "shopping": [],
-                        "chores": [],
-                        "photo": photo_url,
-                    },
-                }
-            )
-        data = _ICLOUD_CACHE["data"]
-    except Exception:
-        logging.exception("Error fetching iCloud data")
+    if "timestamp" not in _ICLOUD_CACHE or time.time() - _ICLOUD_CACHE["timestamp"] > _TTL:
+        # Never wait here: the stale (or empty) payload is served and
+        # subscribers are notified when the refresh publishes
+        _start_refresh()
+    data = _ICLOUD_CACHE.get("data")
+    if data is None:
         data = {
             "events": [],
             "today": [],
@@ -347,4 +483,23 @@ def get_icloud_data():
             "chores": [],
             "photo": None,
         }
+    return data
+
+
+@icloud_bp.route("/photo/<name>")
+def get_photo(name):
+    if not name.endswith(".jpg"):
+        return jsonify({"status": "error", "error": "not found"}), 404
+    # File names are content hashes, so they can be cached forever
+    resp = send_from_directory(_PHOTO_CACHE.directory, name, max_age=365 * 24 * 3600)
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
+@icloud_bp.route("/data")
+def get_icloud_data():
+    data = icloud_payload()
+    if data is None:
+        return jsonify({"status": "2fa_required"})
     return jsonify({"status": "ok", "data": data})
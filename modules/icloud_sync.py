@@ -0,0 +1,126 @@
+import logging
+from datetime import datetime, timedelta
+
+
+def _event_start(event):
+    """Parses pyicloud's startDate ([YYYYMMDD, y, m, d, h, min, ...] or ISO string)."""
+    value = event.get("startDate")
+    try:
+        if isinstance(value, (list, tuple)) and len(value) >= 6:
+            return datetime(int(value[1]), int(value[2]), int(value[3]), int(value[4]), int(value[5]))
+        if isinstance(value, str):
+            return datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def _event_payload(event):
+    return {
+        "uid": event.get("guid"),
+        "title": event.get("title"),
+        "start": event.get("startDate"),
+        "end": event.get("endDate"),
+    }
+
+
+class CalendarSync:
+    """
+    Incremental calendar sync over a rolling date window.
+
+    Events live in a local store keyed by uid together with their etag and
+    calendar guid. Each calendar's ctag is remembered, so a refresh only
+    downloads events when a calendar changed or the window moved, and only
+    re-processes events whose etag differs from the stored one.
+    """
+
+    def __init__(self, before_days=7, after_days=49):
+        # Default window covers the 6x7 month grid around the current month
+        self.before = timedelta(days=before_days)
+        self.after = timedelta(days=after_days)
+        self.events = {}  # uid -> {"etag", "calendar", "start", "payload"}
+        self.ctags = {}  # calendar guid -> ctag
+        self.window = None  # (start, end)
+        self.last_stats = {}
+
+    def window_for(self, today):
+        first = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return first - self.before, first + self.after
+
+    def _uncovered(self, window):
+        """Parts of ``window`` not already covered by the synced window."""
+        if self.window is None:
+            return [window]
+        start, end = window
+        old_start, old_end = self.window
+        if end <= old_start or start >= old_end:
+            return [window]
+        ranges = []
+        if start < old_start:
+            ranges.append((start, old_start))
+        if end > old_end:
+            ranges.append((old_end, end))
+        return ranges
+
+    def _merge(self, event, force):
+        uid = event.get("guid")
+        if not uid:
+            return False
+        stored = self.events.get(uid)
+        etag = event.get("etag")
+        if stored is not None and not force:
+            return False
+        if stored is not None and etag is not None and stored["etag"] == etag:
+            return False
+        self.events[uid] = {
+            "etag": etag,
+            "calendar": event.get("pGuid"),
+            "start": _event_start(event),
+            "payload": _event_payload(event),
+        }
+        return True
+
+    def sync(self, api, calendars, today=None):
+        """
+        Brings the store up to date and returns the event payloads in the
+        current window. ``calendars`` are the raw collection dicts from
+        ``api.calendar.calendars()`` (used for their guid/ctag).
+        """
+        window = self.window_for(today or datetime.now())
+        ctags = {c.get("guid"): c.get("ctag") for c in calendars if isinstance(c, dict) and c.get("guid")}
+        # Calendars without a ctag (or an unknown calendar list) always count as changed
+        changed = {guid for guid, tag in ctags.items() if tag is None or self.ctags.get(guid) != tag}
+        unknown = not ctags
+
+        # Drop events from deleted calendars and events that slid out of the window
+        for uid, stored in list(self.events.items()):
+            if ctags and stored["calendar"] not in ctags:
+                del self.events[uid]
+            elif stored["start"] is not None and not (window[0] <= stored["start"] < window[1]):
+                del self.events[uid]
+
+        fetched = merged = 0
+        if unknown or changed or self.window is None:
+            # pyicloud can't filter by calendar, so fetch the window once and
+            # only reconcile events belonging to calendars whose ctag moved
+            seen = set()
+            for event in api.calendar.events(window[0], window[1]):
+                fetched += 1
+                force = unknown or event.get("pGuid") in changed
+                seen.add(event.get("guid"))
+                merged += self._merge(event, force)
+            for uid, stored in list(self.events.items()):
+                if (unknown or stored["calendar"] in changed) and uid not in seen:
+                    del self.events[uid]
+        else:
+            for start, end in self._uncovered(window):
+                for event in api.calendar.events(start, end):
+                    fetched += 1
+                    merged += self._merge(event, True)
+
+        self.ctags = ctags
+        self.window = window
+        self.last_stats = {"fetched": fetched, "merged": merged, "changed_calendars": len(changed)}
+        logging.info(f"iCloud calendar sync: {self.last_stats}")
+        ordered = sorted(self.events.values(), key=lambda s: (s["start"] or datetime.min, s["payload"]["uid"]))
+        return [stored["payload"] for stored in ordered]
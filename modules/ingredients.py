@@ -0,0 +1,235 @@
+import re
+
+# Bump when parsing changes so stored recipes are re-parsed on start
+PARSER_VERSION = 1
+
+# Canonical unit -> (base unit, factor to base)
+_UNITS = {
+    "tsp": ("ml", 4.92892),
+    "tbsp": ("ml", 14.7868),
+    "cup": ("ml", 236.588),
+    "fl oz": ("ml", 29.5735),
+    "pint": ("ml", 473.176),
+    "quart": ("ml", 946.353),
+    "gallon": ("ml", 3785.41),
+    "ml": ("ml", 1),
+    "l": ("ml", 1000),
+    "g": ("g", 1),
+    "kg": ("g", 1000),
+    "oz": ("g", 28.3495),
+    "lb": ("g", 453.592),
+}
+
+# Spellings -> canonical unit; units missing from _UNITS are counted as-is
+_ALIASES = {
+    "t": "tsp", "tsp": "tsp", "tsps": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "tbsp": "tbsp", "tbsps": "tbsp", "tbs": "tbsp", "tbl": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "c": "cup", "cup": "cup", "cups": "cup",
+    "pint": "pint", "pints": "pint", "pt": "pint",
+    "quart": "quart", "quarts": "quart", "qt": "quart",
+    "gallon": "gallon", "gallons": "gallon", "gal": "gallon",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "g": "g", "gram": "g", "grams": "g",
+    "kg": "kg", "kilogram": "kg", "kilograms": "kg",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "pinch": "pinch", "pinches": "pinch", "dash": "dash", "dashes": "dash",
+    "clove": "clove", "cloves": "clove",
+    "slice": "slice", "slices": "slice",
+    "stick": "stick", "sticks": "stick",
+    "bunch": "bunch", "bunches": "bunch",
+    "head": "head", "heads": "head",
+    "can": "can", "cans": "can",
+    "package": "package", "packages": "package", "pkg": "package", "pkgs": "package",
+    "jar": "jar", "jars": "jar",
+    "bag": "bag", "bags": "bag",
+    "box": "box", "boxes": "box",
+    "bottle": "bottle", "bottles": "bottle",
+}
+
+# Containers that only wrap an explicit size ("1 8 oz package cream cheese")
+_CONTAINERS = {"can", "package", "jar", "bag", "box", "bottle"}
+
+# Preparation words dropped from the de-duplication key
+_PREP_WORDS = {
+    "chopped", "diced", "minced", "sliced", "softened", "melted", "drained", "shredded", "grated",
+    "peeled", "crushed", "fresh", "freshly", "finely", "roughly", "large", "small", "medium", "optional",
+}
+
+_UNICODE_FRACTIONS = {"½": " 1/2", "⅓": " 1/3", "⅔": " 2/3", "¼": " 1/4", "¾": " 3/4", "⅛": " 1/8"}
+
+_NUMBER = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+_AMOUNT_RE = re.compile(rf"^\s*({_NUMBER})(?:\s*(?:-|to)\s*(?:{_NUMBER}))?\s*")
+
+
+def _number(text):
+    total = 0.0
+    for part in text.split():
+        if "/" in part:
+            num, den = part.split("/", 1)
+            total += float(num) / float(den) if float(den) else 0
+        else:
+            total += float(part)
+    return total
+
+
+def _take_amount(text):
+    """(quantity, rest) for a leading amount; ranges keep the lower bound."""
+    match = _AMOUNT_RE.match(text)
+    if not match:
+        return None, text
+    return _number(match.group(1)), text[match.end():]
+
+
+def _take_unit(text):
+    """(canonical unit, rest) for a leading unit word, else (None, text)."""
+    lowered = text.lower()
+    if lowered.startswith("fl oz") or lowered.startswith("fl. oz"):
+        return "fl oz", text.split("oz", 1)[1].lstrip(". ")
+    word = re.match(r"^([A-Za-z]+)\.?(?=[\s)]|$)\s*", text)
+    if not word:
+        return None, text
+    raw = word.group(1)
+    # A bare capital T is tablespoons, lowercase t teaspoons
+    unit = "tbsp" if raw == "T" else _ALIASES.get(raw.lower())
+    if unit is None:
+        return None, text
+    return unit, text[word.end():]
+
+
+def item_key(item):
+    """De-duplication key: lowercase, no notes or prep words, singular."""
+    item = re.sub(r"\([^)]*\)", " ", item.lower()).split(",", 1)[0]
+    words = []
+    for word in re.findall(r"[a-z][a-z'-]*", item):
+        if word in _PREP_WORDS or word == "of":
+            continue
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("oes"):
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("es") and word[-3] in "sxh":
+            word = word[:-2]
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return " ".join(words)
+
+
+def _normalized(text, quantity, unit, item):
+    item = item.strip(" ,;-") or text.strip()
+    base_unit, base_quantity = unit, quantity
+    if unit in _UNITS and quantity is not None:
+        base_unit, factor = _UNITS[unit]
+        base_quantity = quantity * factor
+    return {
+        "text": text,
+        "quantity": quantity,
+        "unit": unit,
+        "item": item,
+        "key": item_key(item) or item.lower(),
+        "base_unit": base_unit,
+        "base_quantity": base_quantity,
+    }
+
+
+def parse_ingredient(ingredient):
+    """
+    Parses one ingredient line ("1 1/2 cups flour", "1 8 oz package cream
+    cheese") or an {item, unit, quantity} dict into a normalized record.
+    """
+    if isinstance(ingredient, dict):
+        item = str(ingredient.get("item") or "")
+        raw_unit = str(ingredient.get("unit") or "")
+        unit = _ALIASES.get(raw_unit.lower(), raw_unit.lower() or None)
+        try:
+            quantity = float(ingredient.get("quantity"))
+        except (TypeError, ValueError):
+            quantity = None
+        return _normalized(item, quantity, unit, item)
+
+    text = str(ingredient).strip()
+    rest = text
+    for char, replacement in _UNICODE_FRACTIONS.items():
+        rest = rest.replace(char, replacement)
+    quantity, rest = _take_amount(rest)
+    unit = None
+    if quantity is not None:
+        # "1 (8 oz) package" / "1 8 oz package": a size before a container
+        size_match = re.match(r"^\(?\s*(" + _NUMBER + r")\s*", rest)
+        if size_match:
+            size_rest = rest[size_match.end():]
+            size_unit, after = _take_unit(size_rest)
+            if size_unit in _UNITS:
+                after = after.lstrip(") ")
+                container, after_container = _take_unit(after)
+                if container in _CONTAINERS:
+                    after = after_container
+                return _normalized(text, quantity * _number(size_match.group(1)), size_unit, after)
+        unit, rest = _take_unit(rest)
+        if unit in _UNITS:
+            # "8 oz package cream cheese"
+            container, after = _take_unit(rest)
+            if container in _CONTAINERS:
+                rest = after
+    return _normalized(text, quantity, unit, rest)
+
+
+def ingredient_lines(ingredients):
+    """
+    Ingredients as a list: text is split into lines, None is empty.
+    Raises ValueError for anything else that isn't a list.
+    """
+    if ingredients is None:
+        return []
+    if isinstance(ingredients, str):
+        return [line.strip() for line in ingredients.splitlines() if line.strip()]
+    if not isinstance(ingredients, list):
+        raise ValueError("ingredients must be a list or newline-separated text")
+    return ingredients
+
+
+def parse_ingredients(ingredients):
+    return [
+        parse_ingredient(i)
+        for i in ingredient_lines(ingredients)
+        if i and (not isinstance(i, str) or i.strip())
+    ]
+
+
+def _fraction(value):
+    whole = int(value)
+    eighths = round((value - whole) * 8)
+    if eighths == 8:
+        whole, eighths = whole + 1, 0
+    if eighths == 0:
+        # Never round a non-zero amount down to nothing
+        return str(whole) if whole else "1/8"
+    num, den = eighths, 8
+    while num % 2 == 0:
+        num, den = num // 2, den // 2
+    return f"{whole} {num}/{den}" if whole else f"{num}/{den}"
+
+
+def format_amount(quantity, base_unit):
+    """Readable "amount unit" for a total in base units (ml/g or a count unit)."""
+    if not quantity:
+        return ""
+    if base_unit == "ml":
+        for unit in ("cup", "tbsp"):
+            if quantity >= _UNITS[unit][1] * (0.25 if unit == "cup" else 1):
+                amount = quantity / _UNITS[unit][1]
+                return f"{_fraction(amount)} {_plural(unit, amount)}"
+        return f"{_fraction(quantity / _UNITS['tsp'][1])} tsp"
+    if base_unit == "g":
+        unit = "lb" if quantity >= _UNITS["lb"][1] else "oz"
+        return f"{_fraction(quantity / _UNITS[unit][1])} {unit}"
+    amount = _fraction(quantity)
+    return f"{amount} {_plural(base_unit, quantity)}" if base_unit else amount
+
+
+def _plural(unit, quantity):
+    if quantity <= 1 or unit in _UNITS and unit != "cup":
+        return unit
+    return unit + ("es" if unit.endswith(("x", "ch", "sh")) else "s")
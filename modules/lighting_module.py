@@ -1,6 +1,12 @@
 from flask import Blueprint, jsonify
+from collections import deque
+from pathlib import Path
 import logging
+import math
+import os
 import sys
+import threading
+import time
 
 _IS_LINUX = sys.platform.startswith("linux")
 # Attempt Pi sensor imports when on Linux
@@ -12,25 +18,198 @@ if _IS_LINUX:
 
 lighting_bp = Blueprint("lighting", __name__, url_prefix="/api/lighting")
 
+BACKLIGHT_PATH = Path("/sys/class/backlight/rpi_backlight/brightness")
 
-@lighting_bp.route("/data")
-def get_lighting():
+
+class LightSensor:
+    """
+    Long-lived TSL2561 handle sampled on a daemon thread.
+
+    The bus and sensor are opened once and read every ``interval`` seconds
+    into a ring buffer of (timestamp, lux) pairs, so callers only look at
+    the latest sample and never wait on I2C. On a read error the handle is
+    dropped and reopened after an exponentially growing delay.
+    """
+
+    def __init__(self, interval=1.0, history=300, max_backoff=60, on_sample=None):
+        self.interval = interval
+        self.on_sample = on_sample
+        self.max_backoff = max_backoff
+        self.readings = deque(maxlen=history)
+        self.errors = 0
+        self._i2c = None
+        self._sensor = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="light-sensor", daemon=True)
+                self._thread.start()
+
+    def _open(self):
+        self._i2c = busio.I2C(board.SCL, board.SDA)
+        self._sensor = adafruit_tsl2561.TSL2561(self._i2c)
+
+    def _close(self):
+        try:
+            if self._i2c is not None:
+                self._i2c.deinit()
+        except Exception:
+            pass
+        self._i2c = self._sensor = None
+
+    def _run(self):
+        failures = 0
+        while True:
+            try:
+                if self._sensor is None:
+                    self._open()
+                # lux is None when the sensor is saturated
+                lux = self._sensor.lux
+            except Exception:
+                failures += 1
+                self.errors += 1
+                if failures == 1:
+                    logging.exception("Error reading ambient light sensor; reopening with backoff")
+                self._close()
+                time.sleep(min(self.interval * 2**failures, self.max_backoff))
+                continue
+            if failures:
+                logging.info(f"Ambient light sensor recovered after {failures} failed reads")
+            failures = 0
+            with self._lock:
+                self.readings.append((time.time(), lux))
+            if self.on_sample is not None and lux is not None:
+                try:
+                    self.on_sample(lux)
+                except Exception:
+                    logging.exception("Error handling ambient light sample")
+            time.sleep(self.interval)
+
+    def latest(self):
+        """Most recent lux reading, or None if there is no recent sample."""
+        with self._lock:
+            if not self.readings:
+                return None
+            at, lux = self.readings[-1]
+        # A sample older than a few intervals means the sensor is failing
+        if time.time() - at > max(3 * self.interval, 5):
+            return None
+        return lux
+
+    def history(self):
+        with self._lock:
+            return list(self.readings)
+
+
+def parse_curve(spec):
+    """Parses "lux:brightness,..." into sorted (lux, brightness) points."""
+    points = []
+    for pair in spec.split(","):
+        lux, brightness = pair.split(":")
+        points.append((float(lux), float(brightness)))
+    if not points:
+        raise ValueError("empty backlight curve")
+    return sorted(points)
+
+
+def _quantize(lux):
+    # Two significant digits, so sensor jitter doesn't count as a change
+    if lux < 100:
+        return round(lux)
+    return round(lux, 1 - int(math.floor(math.log10(lux))))
+
+
+class BacklightController:
+    """
+    Drives the panel backlight from ambient light samples.
+
+    Samples go through a short median (drops single-sample spikes) and an
+    exponential moving average, then a piecewise-linear lux -> brightness
+    curve. The target only moves when it differs from the current one by
+    at least ``hysteresis`` steps, the output ramps towards it by at most
+    ``max_step`` per sample, and sysfs is written only when the output
+    value actually changes.
+    """
+
+    def __init__(self, path, curve, alpha=0.2, median=5, hysteresis=8, max_step=4):
+        self.path = path
+        self.curve = curve
+        self.alpha = alpha
+        self.hysteresis = hysteresis
+        self.max_step = max_step
+        self.window = deque(maxlen=median)
+        self.lux = None
+        self.target = None
+        self.brightness = None
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def brightness_for(self, lux):
+        points = self.curve
+        if lux <= points[0][0]:
+            return points[0][1]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            if lux <= x1:
+                return y0 + (y1 - y0) * (lux - x0) / (x1 - x0)
+        return points[-1][1]
+
+    def update(self, lux):
+        with self._lock:
+            self.window.append(lux)
+            median = sorted(self.window)[len(self.window) // 2]
+            self.lux = median if self.lux is None else self.lux + self.alpha * (median - self.lux)
+            wanted = int(round(max(0, min(255, self.brightness_for(self.lux)))))
+            if self.target is None or abs(wanted - self.target) >= self.hysteresis:
+                self.target = wanted
+            if self.brightness is None:
+                # Ramp from whatever the panel is currently set to
+                try:
+                    self.brightness = int(self.path.read_text().strip())
+                except (OSError, ValueError):
+                    pass
+            current = self.target if self.brightness is None else self.brightness
+            step = max(-self.max_step, min(self.max_step, self.target - current))
+            output = current + step
+            if output == self.brightness:
+                return
+            try:
+                self.path.write_text(str(output))
+            except OSError:
+                logging.exception("Error writing backlight brightness")
+                return
+            self.brightness = output
+            self.writes += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "ambient_light": None if self.lux is None else _quantize(self.lux),
+                "brightness": self.brightness,
+            }
+
+
+_BACKLIGHT = BacklightController(
+    BACKLIGHT_PATH,
+    parse_curve(os.getenv("BACKLIGHT_CURVE", "0:0,1000:255")),
+    hysteresis=int(os.getenv("BACKLIGHT_HYSTERESIS", "8")),
+)
+_SENSOR = LightSensor(interval=float(os.getenv("LIGHT_SAMPLE_INTERVAL", "1.0")), on_sample=_BACKLIGHT.update)
+
+
+def lighting_payload():
     if not _IS_LINUX:
         # Stub ambient light on non-Linux for cross-platform development
-        return jsonify({"status": "ok", "data": {"ambient_light": None}})
-    try:
-        # Initialize I2C and sensor
-        i2c = busio.I2C(board.SCL, board.SDA)
-        sensor = adafruit_tsl2561.TSL2561(i2c)
-        light = sensor.lux
-        # Compute brightness and write backlight if on Linux
-        if light is not None:
-            brightness = int(max(0, min(light / 1000, 1)) * 255)
-            from pathlib import Path
-
-            backlight_path = Path("/sys/class/backlight/rpi_backlight/brightness")
-            backlight_path.write_text(str(brightness))
-    except Exception:
-        logging.exception("Error reading ambient light sensor")
-        light = None
-    return jsonify({"status": "ok", "data": {"ambient_light": light}})
+        return {"ambient_light": None}
+    _SENSOR.start()
+    if _SENSOR.latest() is None:
+        return {"ambient_light": None, "brightness": _BACKLIGHT.brightness}
+    # Filtered and rounded, so small fluctuations don't produce a new update
+    return _BACKLIGHT.stats()
+
+
+@lighting_bp.route("/data")
+def get_lighting():
+    return jsonify({"status": "ok", "data": lighting_payload()})
@@ -1,13 +1,17 @@
 import os
-import json
 from pathlib import Path
 from flask import Blueprint, Response, request, jsonify
-from dotenv import load_dotenv
-import requests
-from datetime import datetime
+from datetime import datetime, timedelta
+import hashlib
+import logging
 import uuid
 
-load_dotenv()
+from modules.ingredients import ingredient_lines
+from modules.meals_store import MealsStore, months_between
+from modules.shopping_index import ShoppingIndex
+from modules.spoonacular import RateLimited, SearchIndex, SpoonacularClient
+from modules.storage import CACHE_DIR
+
 SPOONACULAR_API_KEY = os.getenv("SPOONACULAR_API_KEY")
 
 meals_bp = Blueprint("meals", __name__, url_prefix="/api/meals")
@@ -18,43 +22,144 @@ DATA_DIR = Path(__file__).parent.parent / "data"
 DATA_DIR.mkdir(exist_ok=True)
 MEALS_FILE = DATA_DIR / "meals_data.json"
 RECIPES_FILE = DATA_DIR / "recipes.json"
+MEALS_DB = DATA_DIR / "meals.db"
+MEALS_SNAPSHOT = DATA_DIR / "meals_snapshot.json"
 
-if not MEALS_FILE.exists():
-    with open(MEALS_FILE, "w") as f:
-        json.dump({}, f)
-if not RECIPES_FILE.exists():
-    with open(RECIPES_FILE, "w") as f:
-        json.dump({}, f)
+# Indexed store; the latest snapshot (when rebuilding a lost database) or
+# the legacy JSON files are imported into it on first start
+MEALS_STORE = MealsStore(MEALS_DB, MEALS_FILE, RECIPES_FILE, snapshot=MEALS_SNAPSHOT)
+SHOPPING_INDEX = ShoppingIndex(MEALS_STORE)
+SPOONACULAR = SpoonacularClient(SPOONACULAR_API_KEY, CACHE_DIR / "spoonacular")
+SAVED_RECIPE_INDEX = SearchIndex()
 
 
-def load_meals():
-    with open(MEALS_FILE, "r") as f:
-        return json.load(f)
+# Store versions restart at zero, so validators are scoped to this process
+_BOOT_ID = uuid.uuid4().hex[:8]
 
 
-def save_meals(data):
-    with open(MEALS_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def _index_saved_recipe(recipe_uuid):
+    recipe = MEALS_STORE.get_recipe(recipe_uuid)
+    if recipe is None:
+        SAVED_RECIPE_INDEX.remove(recipe_uuid)
+        return
+    text = " ".join(
+        [p["item"] for p in recipe.get("parsed_ingredients", [])] + [str(t) for t in recipe.get("tags", [])]
+    )
+    SAVED_RECIPE_INDEX.add(recipe_uuid, recipe.get("title"), text, {"uuid": recipe_uuid, "title": recipe.get("title")})
 
 
-def load_recipes():
-    with open(RECIPES_FILE, "r") as f:
-        return json.load(f)
+for _uuid in MEALS_STORE.all_recipes():
+    _index_saved_recipe(_uuid)
+MEALS_STORE.subscribe(lambda batch: [_index_saved_recipe(u) for u in batch.recipes])
+
+
+def meal_changes(batch):
+    """
+    meals_patch payload for a committed MealsBatch: net slot changes and the
+    current state of every touched recipe (None when deleted). Returns None
+    when the batch changed nothing.
+    """
+    recipes = [{"uuid": u, "recipe": MEALS_STORE.get_recipe(u)} for u in sorted(batch.recipes)]
+    slots = batch.slot_changes
+    if not (slots or recipes):
+        return None
+    return {"slots": slots, "recipes": recipes}
+
+
+def snapshot_meals():
+    """Exports meals and recipes to MEALS_SNAPSHOT when they changed since the last run."""
+    if MEALS_STORE.export_snapshot(MEALS_SNAPSHOT):
+        logging.info(f"Wrote meal plan snapshot to {MEALS_SNAPSHOT}")
+
+
+def load_meals():
+    return MEALS_STORE.all_meals()
 
 
-def save_recipes(data):
-    with open(RECIPES_FILE, "w") as f:
-        json.dump(data, f, indent=2)
+def load_recipes():
+    return MEALS_STORE.all_recipes()
+
+
+def _conditional_json(etag, build):
+    """
+    Answers 304 when the client's If-None-Match matches ``etag``; otherwise
+    builds the payload and returns it with the ETag set.
+    """
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(build())
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+def _month_recipe_uuids(month):
+    return {
+        slot.get("recipe_uuid")
+        for day in MEALS_STORE.month_meals(month).values()
+        for slot in day.values()
+        if isinstance(slot, dict) and slot.get("recipe_uuid")
+    }
 
 
 @meals_bp.route("/data", methods=["GET"])
 def get_meals():
-    return jsonify(load_meals())
+    """
+    Meal plan as {month: {date: {meal_type: slot}}}.
+
+    ``?month=YYYY-MM`` or ``?start=YYYY-MM-DD&end=YYYY-MM-DD`` limit the
+    response to that window; ``&include=recipes`` wraps it as
+    {"meals": ..., "recipes": {uuid: recipe}} with every referenced recipe.
+    Without a window the full history is returned, as before.
+    """
+    month = request.args.get("month")
+    start = request.args.get("start")
+    end = request.args.get("end")
+    include_recipes = request.args.get("include") == "recipes"
+    try:
+        if month:
+            # Normalized, so "2025-6" is read as "2025-06"
+            month = datetime.strptime(month, "%Y-%m").strftime("%Y-%m")
+            start, end = f"{month}-01", f"{month}-31"
+        elif start or end:
+            # Same bounds as /bulk: start <= end, at most _BULK_MAX_DAYS days
+            days = _day_range(start, end)
+            start, end = days[0], days[-1]
+    except ValueError:
+        return jsonify({"error": f"Invalid range. Use month=YYYY-MM or start<=end (YYYY-MM-DD, up to {_BULK_MAX_DAYS} days)"}), 400
+    if not start:
+        if not include_recipes:
+            return _conditional_json(f"{_BOOT_ID}-m{MEALS_STORE.meals_version}", load_meals)
+        etag = f"{_BOOT_ID}-m{MEALS_STORE.meals_version}-r{MEALS_STORE.recipes_version}"
+        meals_fn = load_meals
+    else:
+        versions = ".".join(str(MEALS_STORE.month_version(m)) for m in months_between(start[:7], end[:7]))
+        etag = f"{_BOOT_ID}-{start}-{end}-{versions}"
+        if include_recipes:
+            etag += f"-r{MEALS_STORE.recipes_version}"
+        meals_fn = lambda: MEALS_STORE.meals_in_range(start, end)
+
+    def build():
+        meals = meals_fn()
+        if not include_recipes:
+            return meals
+        uuids = {
+            slot.get("recipe_uuid")
+            for days in meals.values()
+            for day in days.values()
+            for slot in day.values()
+            if isinstance(slot, dict)
+        }
+        recipes = MEALS_STORE.all_recipes()
+        return {"meals": meals, "recipes": {u: recipes[u] for u in sorted(uuids, key=str) if u in recipes}}
+
+    return _conditional_json(etag, build)
 
 
 @meals_bp.route("/update", methods=["POST"])
 def update_meal():
-    req = request.get_json()
+    req = request.get_json(silent=True) or {}
     month = req.get("month")
     date = req.get("date")
     meal_type = req.get("mealType")
@@ -62,20 +167,114 @@ def update_meal():
     servings = req.get("servings", 0)
     if not (month and date and meal_type and recipe_uuid):
         return jsonify({"error": "Missing fields"}), 400
-    data = load_meals()
-    data.setdefault(month, {})
-    data[month].setdefault(date, {})
-    data[month][date][meal_type] = {"recipe_uuid": recipe_uuid, "servings": servings}
-    save_meals(data)
+    if not (_is_name(meal_type) and _is_name(recipe_uuid)):
+        return jsonify({"error": "mealType and recipe_uuid must be strings"}), 400
+    try:
+        _parse_day(date)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    MEALS_STORE.set_slot(date, meal_type, {"recipe_uuid": recipe_uuid, "servings": servings})
     return jsonify({"status": "ok"})
 
 
+# Largest span a single bulk operation may touch
+_BULK_MAX_DAYS = 366
+
+
+def _parse_day(value):
+    try:
+        if not isinstance(value, str):
+            raise ValueError
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}. Use YYYY-MM-DD")
+
+
+def _day_range(start, end=None, days=None):
+    """YYYY-MM-DD strings from ``start`` to ``end`` inclusive, or ``days`` days from ``start``."""
+    first = _parse_day(start)
+    if days is None:
+        days = (_parse_day(end) - first).days + 1
+    if not isinstance(days, int) or not 0 < days <= _BULK_MAX_DAYS:
+        raise ValueError(f"Range must span 1-{_BULK_MAX_DAYS} days")
+    return [(first + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+
+def _is_name(value):
+    return isinstance(value, str) and bool(value)
+
+
+def _apply_bulk_op(batch, op):
+    kind = op.get("op")
+    if kind == "set":
+        if not (_is_name(op.get("mealType")) and _is_name(op.get("recipe_uuid"))):
+            raise ValueError("set needs date, mealType and recipe_uuid")
+        date = _day_range(op.get("date"), days=1)[0]
+        batch.set_slot(date, op["mealType"], {"recipe_uuid": op["recipe_uuid"], "servings": op.get("servings", 0)})
+    elif kind == "clear":
+        if not _is_name(op.get("mealType")):
+            raise ValueError("clear needs date and mealType")
+        batch.clear_slot(_day_range(op.get("date"), days=1)[0], op["mealType"])
+    elif kind == "clear_range":
+        days = _day_range(op.get("start"), op.get("end"))
+        meal_types = op.get("mealTypes")
+        if meal_types is not None and not (isinstance(meal_types, list) and all(_is_name(t) for t in meal_types)):
+            raise ValueError("mealTypes must be a list of meal type names")
+        for date, meal_type, _ in batch.slots_between(days[0], days[-1]):
+            if meal_types is None or meal_type in meal_types:
+                batch.clear_slot(date, meal_type)
+    elif kind == "copy_range":
+        # Copies the slots of from..from+days-1 onto to..to+days-1 (e.g. week A to week B)
+        source = _day_range(op.get("from"), days=op.get("days", 7))
+        target = _day_range(op.get("to"), days=len(source))
+        offset = dict(zip(source, target))
+        copies = batch.slots_between(source[0], source[-1])
+        if op.get("overwrite"):
+            for date, meal_type, _ in batch.slots_between(target[0], target[-1]):
+                batch.clear_slot(date, meal_type)
+        for date, meal_type, slot in copies:
+            batch.set_slot(offset[date], meal_type, slot)
+    elif kind == "fill_range":
+        # Repeats a list of day templates ({mealType: slot}) across start..end
+        template = op.get("template")
+        if not (isinstance(template, list) and template and all(isinstance(d, dict) for d in template)):
+            raise ValueError("fill_range needs a non-empty template list")
+        for i, date in enumerate(_day_range(op.get("start"), op.get("end"))):
+            for meal_type, slot in template[i % len(template)].items():
+                if isinstance(slot, dict) and slot.get("recipe_uuid") is not None and not _is_name(slot["recipe_uuid"]):
+                    raise ValueError("recipe_uuid must be a string")
+                if isinstance(slot, dict) and slot.get("recipe_uuid"):
+                    batch.set_slot(date, meal_type, slot)
+                elif slot is None and op.get("overwrite"):
+                    batch.clear_slot(date, meal_type)
+    else:
+        raise ValueError(f"Unknown op {kind!r}")
+
+
+@meals_bp.route("/bulk", methods=["POST"])
+def bulk_update_meals():
+    """
+    Applies a list of slot operations in one transaction: set, clear,
+    clear_range, copy_range (e.g. copy a week) and fill_range (repeat a
+    template). Either every operation is applied or none is; the response
+    lists the net slot changes.
+    """
+    ops = (request.get_json(silent=True) or {}).get("ops")
+    if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+        return jsonify({"error": "ops must be a list of operations"}), 400
+    try:
+        with MEALS_STORE.transaction() as batch:
+            for op in ops:
+                _apply_bulk_op(batch, op)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"status": "ok", "changes": batch.slot_changes})
+
+
 @meals_bp.route("/today", methods=["GET"])
 def get_todays_meals():
     today_str = datetime.now().strftime("%Y-%m-%d")
-    month_key = datetime.now().strftime("%Y-%m")
-    data = load_meals()
-    todays_data = data.get(month_key, {}).get(today_str, {})
+    todays_data = MEALS_STORE.get_day(today_str)
     return jsonify({
         "breakfast": todays_data.get("breakfast"),
         "lunch": todays_data.get("lunch"),
@@ -86,28 +285,7 @@ def get_todays_meals():
 @meals_bp.route("/shopping-list/today", methods=["GET"])
 def get_todays_shopping_list():
     today_str = datetime.now().strftime("%Y-%m-%d")
-    month_key = datetime.now().strftime("%Y-%m")
-    data = load_meals()
-    recipes = load_recipes()
-    aggregated = {}
-    todays_meals = data.get(month_key, {}).get(today_str, {})
-    for meal in todays_meals.values():
-        if isinstance(meal, dict):
-            r_uuid = meal.get("recipe_uuid")
-            servings = meal.get("servings", 1)
-            recipe = recipes.get(r_uuid)
-            if not recipe:
-                continue
-            default = recipe.get("default_servings", 1) or 1
-            factor = servings / default
-            for ing in recipe.get("ingredients", []):
-                item = ing.get("item")
-                unit = ing.get("unit")
-                qty = ing.get("quantity", 0) * factor
-                key = (item, unit)
-                aggregated[key] = aggregated.get(key, 0) + qty
-    result = [{"item": k[0], "unit": k[1], "quantity": v} for k, v in aggregated.items()]
-    return jsonify(result)
+    return jsonify(SHOPPING_INDEX.totals(today_str, today_str))
 
 
 @meals_bp.route("/add-recipe", methods=["POST"])
@@ -117,110 +295,71 @@ def add_recipe_to_meal():
     meal_type = req.get("mealType")
     recipe = req.get("recipe")
     servings = req.get("servings")
-    if not (date_str and meal_type and recipe and isinstance(recipe, dict)):
+    if not (date_str and _is_name(meal_type) and recipe and isinstance(recipe, dict)):
         return jsonify({"error": "Missing or invalid fields"}), 400
     try:
-        date_obj = datetime.strptime(date_str, "%Y-%m-%d")
-        month_key = date_obj.strftime("%Y-%m")
-        day_key = date_obj.strftime("%Y-%m-%d")
+        ingredients = ingredient_lines(recipe.get("ingredients"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        day_key = _parse_day(date_str).strftime("%Y-%m-%d")
     except ValueError:
         return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
     r_uuid = str(uuid.uuid4())
     recipe_obj = {
         "uuid": r_uuid,
         "title": recipe.get("title"),
-        "ingredients": recipe.get("ingredients", []),
+        "ingredients": ingredients,
         "tags": recipe.get("tags", []),
         "isFavorite": recipe.get("isFavorite", False),
         "source": recipe.get("source", "local"),
         "default_servings": recipe.get("default_servings", servings or 1),
     }
-    recipes = load_recipes()
-    recipes[r_uuid] = recipe_obj
-    save_recipes(recipes)
     if servings is None:
         servings = recipe_obj.get("default_servings", 1)
-    data = load_meals()
-    data.setdefault(month_key, {})
-    data[month_key].setdefault(day_key, {})
-    data[month_key][day_key][meal_type] = {"recipe_uuid": r_uuid, "servings": servings}
-    save_meals(data)
+    # Recipe and slot are written in one transaction
+    with MEALS_STORE.transaction() as batch:
+        batch.put_recipe(recipe_obj)
+        batch.set_slot(day_key, meal_type, {"recipe_uuid": r_uuid, "servings": servings})
     return jsonify({"status": "ok", "recipe_uuid": r_uuid})
 
 
 @meals_bp.route("/favorites/full", methods=["GET"])
 def get_full_favorites():
-    recipes = load_recipes()
-    favorites = [r for r in recipes.values() if r.get("isFavorite")]
-    return jsonify(favorites)
+    return jsonify(MEALS_STORE.favorite_recipes())
 
 
 @meals_bp.route("/favorites", methods=["GET"])
 def get_favorites() -> Response:
-    recipes = load_recipes()
-    favorite_recipes: list[tuple[str, str]] = [(r.get("uuid"), r.get("title")) for r in recipes.values() if r.get("isFavorite")]
-    return jsonify(sorted(favorite_recipes))
+    favorite_recipes: list[tuple[str, str]] = [(r.get("uuid"), r.get("title")) for r in MEALS_STORE.favorite_recipes()]
+    return jsonify(favorite_recipes)
 
 
 @meals_bp.route("/shopping-list", methods=["GET"])
 def get_shopping_list():
-    data = load_meals()
-    recipes = load_recipes()
-    aggregated = {}
     start = request.args.get("start")
     end = request.args.get("end")
-    date_filter = None
     if start and end:
         try:
-            start_dt = datetime.strptime(start, "%Y-%m-%d")
-            end_dt = datetime.strptime(end, "%Y-%m-%d")
-            date_filter = (start_dt, end_dt)
-        except Exception:
-            date_filter = None
-    for month_key, month in data.items():
-        for day_key, day in month.items():
-            if date_filter:
-                try:
-                    day_dt = datetime.strptime(day_key, "%Y-%m-%d")
-                except Exception:
-                    continue
-                if not (date_filter[0] <= day_dt <= date_filter[1]):
-                    continue
-            for meal in day.values():
-                if isinstance(meal, dict):
-                    r_uuid = meal.get("recipe_uuid")
-                    servings = meal.get("servings", 1)
-                    recipe = recipes.get(r_uuid)
-                    if not recipe:
-                        continue
-                    default = recipe.get("default_servings", 1) or 1
-                    factor = servings / default
-                    for ing in recipe.get("ingredients", []):
-                        item = ing.get("item")
-                        unit = ing.get("unit")
-                        qty = ing.get("quantity", 0) * factor
-                        key = (item, unit)
-                        aggregated[key] = aggregated.get(key, 0) + qty
-    result = [{"item": k[0], "unit": k[1], "quantity": v} for k, v in aggregated.items()]
-    return jsonify(result)
+            datetime.strptime(start, "%Y-%m-%d")
+            datetime.strptime(end, "%Y-%m-%d")
+        except ValueError:
+            start = end = None
+    else:
+        start = end = None
+    return jsonify(SHOPPING_INDEX.totals(start, end))
 
 
 @meals_bp.route("/search", methods=["GET"])
 def search_recipes():
-    query = request.args.get("query", "")
-    if not query or not SPOONACULAR_API_KEY:
-        return jsonify({"results": []})
-    url = "https://api.spoonacular.com/recipes/complexSearch"
-    params = {
-        "query": query,
-        "apiKey": SPOONACULAR_API_KEY,
-        "number": 10,
-    }
-    resp = requests.get(url, params=params)
-    try:
-        return jsonify(resp.json())
-    except Exception:
-        return jsonify({"results": []})
+    """
+    Spoonacular results for ``?query=`` (cached and rate-limited), plus
+    matching saved recipes under "local".
+    """
+    query = request.args.get("query", "").strip()
+    if not query:
+        return jsonify({"results": [], "local": []})
+    return jsonify({"results": SPOONACULAR.search(query), "local": SAVED_RECIPE_INDEX.search(query)})
 
 
 @meals_bp.route("/recipe", methods=["GET"])
@@ -228,26 +367,14 @@ def get_recipe_details():
     recipe_id = request.args.get("id")
     if not recipe_id or not SPOONACULAR_API_KEY:
         return jsonify({"error": "Missing id or API key"}), 400
-    url = f"https://api.spoonacular.com/recipes/{recipe_id}/information"
-    params = {"apiKey": SPOONACULAR_API_KEY}
     try:
-        resp = requests.get(url, params=params)
-        data = resp.json()
-        title = data.get("title", "")
-        ingredients = [
-            i.get("originalString") or i.get("original") or i.get("name", "")
-            for i in data.get("extendedIngredients", [])
-        ]
-        tags = list(set(data.get("dishTypes", []) + data.get("diets", [])))
-        recipe_obj = {
-            "title": title,
-            "ingredients": ingredients,
-            "tags": tags,
-            "source": "spoonacular",
-        }
-        return jsonify(recipe_obj)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        recipe = SPOONACULAR.recipe(recipe_id)
+    except RateLimited:
+        return jsonify({"error": "Spoonacular rate limit reached, try again shortly"}), 429
+    except Exception:
+        logging.exception("Error fetching Spoonacular recipe")
+        return jsonify({"error": "Error fetching recipe"}), 500
+    return jsonify({k: recipe.get(k) for k in ("title", "ingredients", "tags", "source")})
 
 
 @recipes_bp.route("", methods=["GET"])
@@ -255,9 +382,31 @@ def list_recipes():
     return jsonify(list(load_recipes().values()))
 
 
+@recipes_bp.route("/batch", methods=["GET"])
+def get_recipes_batch():
+    """
+    Returns {uuid: recipe} for ``?uuids=a,b,c`` and/or every recipe referenced
+    by ``?month=YYYY-MM`` in one response. Unknown uuids are omitted.
+    """
+    uuids = {u for u in request.args.get("uuids", "").split(",") if u}
+    month = request.args.get("month")
+    key = ",".join(sorted(uuids))
+    if month:
+        key += f"|{month}:{MEALS_STORE.month_version(month)}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    etag = f"{_BOOT_ID}-r{MEALS_STORE.recipes_version}-{digest}"
+
+    def build():
+        wanted = uuids | (_month_recipe_uuids(month) if month else set())
+        recipes = MEALS_STORE.all_recipes()
+        return {u: recipes[u] for u in sorted(wanted) if u in recipes}
+
+    return _conditional_json(etag, build)
+
+
 @recipes_bp.route("/<recipe_uuid>", methods=["GET"])
 def get_recipe(recipe_uuid):
-    recipe = load_recipes().get(recipe_uuid)
+    recipe = MEALS_STORE.get_recipe(recipe_uuid)
     if not recipe:
         return jsonify({"error": "not found"}), 404
     return jsonify(recipe)
@@ -266,19 +415,21 @@ def get_recipe(recipe_uuid):
 @recipes_bp.route("/add", methods=["POST"])
 def add_recipe():
     data = request.get_json() or {}
+    try:
+        ingredients = ingredient_lines(data.get("ingredients"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     r_uuid = str(uuid.uuid4())
     recipe_obj = {
         "uuid": r_uuid,
         "title": data.get("title"),
-        "ingredients": data.get("ingredients", []),
+        "ingredients": ingredients,
         "tags": data.get("tags", []),
         "isFavorite": data.get("isFavorite", False),
         "source": data.get("source", "local"),
         "default_servings": data.get("default_servings", 1),
     }
-    recipes = load_recipes()
-    recipes[r_uuid] = recipe_obj
-    save_recipes(recipes)
+    MEALS_STORE.put_recipe(recipe_obj)
     return jsonify(recipe_obj), 201
 
 
@@ -288,11 +439,14 @@ def update_recipe():
     r_uuid = data.get("uuid")
     if not r_uuid:
         return jsonify({"error": "uuid required"}), 400
-    recipes = load_recipes()
-    if r_uuid not in recipes:
+    fields = {k: v for k, v in data.items() if k != "uuid"}
+    if "ingredients" in fields:
+        try:
+            fields["ingredients"] = ingredient_lines(fields["ingredients"])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    if MEALS_STORE.update_recipe(r_uuid, fields) is None:
         return jsonify({"error": "not found"}), 404
-    recipes[r_uuid].update({k: v for k, v in data.items() if k != "uuid"})
-    save_recipes(recipes)
     return jsonify({"status": "ok"})
 
 
@@ -302,10 +456,7 @@ def delete_recipe():
     r_uuid = data.get("uuid")
     if not r_uuid:
         return jsonify({"error": "uuid required"}), 400
-    recipes = load_recipes()
-    if r_uuid in recipes:
-        recipes.pop(r_uuid)
-        save_recipes(recipes)
+    MEALS_STORE.delete_recipe(r_uuid)
     return jsonify({"status": "ok"})
 
 
@@ -314,16 +465,10 @@ def delete_meal_slot(slot_id):
     """Remove the recipe from the specified meal slot."""
     try:
         date_str, meal_type = slot_id.split("|", 1)
+        _parse_day(date_str)
     except ValueError:
         return jsonify({"error": "invalid slot id"}), 400
-    month_key = date_str[:7]
-    data = load_meals()
-    day = data.get(month_key, {}).get(date_str, {})
-    if meal_type in day:
-        day.pop(meal_type)
-        if not day:
-            data.get(month_key, {}).pop(date_str, None)
-        save_meals(data)
+    MEALS_STORE.clear_slot(date_str, meal_type)
     return jsonify({"status": "ok"})
 
 
@@ -333,14 +478,14 @@ def restore_meal_slot():
     req = request.get_json() or {}
     slot_id = req.get("slot_id")
     recipe = req.get("recipe")
-    if not slot_id or not isinstance(recipe, dict):
+    if not _is_name(slot_id) or not isinstance(recipe, dict):
         return jsonify({"error": "missing fields"}), 400
+    if not _is_name(recipe.get("recipe_uuid")):
+        return jsonify({"error": "recipe_uuid must be a string"}), 400
     try:
         date_str, meal_type = slot_id.split("|", 1)
+        _parse_day(date_str)
     except ValueError:
         return jsonify({"error": "invalid slot id"}), 400
-    month_key = date_str[:7]
-    data = load_meals()
-    data.setdefault(month_key, {}).setdefault(date_str, {})[meal_type] = recipe
-    save_meals(data)
+    MEALS_STORE.set_slot(date_str, meal_type, recipe)
     return jsonify({"status": "ok"})
@@ -0,0 +1,369 @@
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from modules.ingredients import PARSER_VERSION, parse_ingredients
+from modules.storage import atomic_write_json
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS meal_slots (
+    date TEXT NOT NULL,
+    month TEXT NOT NULL,
+    meal_type TEXT NOT NULL,
+    recipe_uuid TEXT,
+    data TEXT NOT NULL,
+    PRIMARY KEY (date, meal_type)
+);
+CREATE INDEX IF NOT EXISTS idx_meal_slots_month ON meal_slots (month);
+CREATE INDEX IF NOT EXISTS idx_meal_slots_recipe ON meal_slots (recipe_uuid);
+CREATE TABLE IF NOT EXISTS recipes (
+    uuid TEXT PRIMARY KEY,
+    title TEXT,
+    is_favorite INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_recipes_favorite ON recipes (is_favorite, title);
+"""
+
+
+def months_between(start_month, end_month):
+    """YYYY-MM keys from ``start_month`` to ``end_month`` inclusive."""
+    year, month = int(start_month[:4]), int(start_month[5:7])
+    months = []
+    while f"{year:04d}-{month:02d}" <= end_month:
+        months.append(f"{year:04d}-{month:02d}")
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+class MealsBatch:
+    """Writes applied inside one MealsStore transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # What this batch touched, used to invalidate the read cache on commit
+        self.dates = set()
+        self.recipes = set()
+        self._slot_changes = {}  # (date, meal_type) -> last slot written, or None if cleared
+
+    @property
+    def slot_changes(self):
+        """Net slot changes as [{"date", "meal_type", "slot"}]; slot is None when cleared."""
+        return [
+            {"date": date, "meal_type": meal_type, "slot": slot}
+            for (date, meal_type), slot in sorted(self._slot_changes.items())
+        ]
+
+    def slots_between(self, start, end):
+        """[(date, meal_type, slot)] for dates between ``start`` and ``end`` inclusive."""
+        rows = self.conn.execute(
+            "SELECT date, meal_type, data FROM meal_slots WHERE date BETWEEN ? AND ? ORDER BY date, meal_type",
+            (start, end),
+        ).fetchall()
+        return [(date, meal_type, json.loads(data)) for date, meal_type, data in rows]
+
+    def set_slot(self, date, meal_type, slot):
+        self.dates.add(date)
+        self.conn.execute(
+            "INSERT INTO meal_slots (date, month, meal_type, recipe_uuid, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (date, meal_type) DO UPDATE SET recipe_uuid = excluded.recipe_uuid, data = excluded.data",
+            (date, date[:7], meal_type, slot.get("recipe_uuid"), json.dumps(slot)),
+        )
+        self._slot_changes[(date, meal_type)] = slot
+
+    def clear_slot(self, date, meal_type):
+        """Removes one slot; returns True if it existed."""
+        self.dates.add(date)
+        cur = self.conn.execute("DELETE FROM meal_slots WHERE date = ? AND meal_type = ?", (date, meal_type))
+        if cur.rowcount > 0:
+            self._slot_changes[(date, meal_type)] = None
+        return cur.rowcount > 0
+
+    def put_recipe(self, recipe):
+        # Ingredients are parsed once here and stored next to the original lines
+        recipe = dict(recipe, parsed_ingredients=parse_ingredients(recipe.get("ingredients")))
+        self.recipes.add(recipe["uuid"])
+        self.conn.execute(
+            "INSERT INTO recipes (uuid, title, is_favorite, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (uuid) DO UPDATE SET title = excluded.title, is_favorite = excluded.is_favorite, "
+            "data = excluded.data",
+            (recipe["uuid"], recipe.get("title"), 1 if recipe.get("isFavorite") else 0, json.dumps(recipe)),
+        )
+
+    def update_recipe(self, recipe_uuid, fields):
+        """Merges ``fields`` into a stored recipe; returns it, or None if missing."""
+        row = self.conn.execute("SELECT data FROM recipes WHERE uuid = ?", (recipe_uuid,)).fetchone()
+        if row is None:
+            return None
+        recipe = json.loads(row[0])
+        recipe.update(fields)
+        self.put_recipe(recipe)
+        return recipe
+
+    def delete_recipe(self, recipe_uuid):
+        self.recipes.add(recipe_uuid)
+        cur = self.conn.execute("DELETE FROM recipes WHERE uuid = ?", (recipe_uuid,))
+        return cur.rowcount > 0
+
+
+class MealsStore:
+    """
+    SQLite storage for meal-plan slots and recipes.
+
+    Each meal slot is one row keyed by (date, meal_type) and each recipe one
+    row keyed by uuid, so a single edit touches a single row. On first
+    start the store is filled from ``snapshot`` if it exists (rebuilding a
+    lost database), otherwise from the legacy meals_data.json / recipes.json.
+
+    Every committed write bumps the ``change_seq`` meta counter, and
+    ``export_snapshot`` writes slots and recipes to one JSON file whenever
+    the counter has moved since the last export.
+
+    Reads are served from in-memory views (uuid -> recipe map, favorites
+    sorted by title, per-month meal maps) that are rebuilt lazily after a
+    commit touches them. Views are shared; callers must not mutate them.
+    """
+
+    def __init__(self, db_path, meals_json=None, recipes_json=None, snapshot=None):
+        self.path = Path(db_path)
+        self._lock = threading.RLock()
+        # Read cache; bumped versions double as cache validators
+        self.recipes_version = 0
+        self.meals_version = 0
+        self._month_versions = {}
+        self._views = {}
+        self._months = {}
+        self._listeners = []
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # FULL fsyncs the WAL on every commit, so an acknowledged edit survives a power cut
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_json(meals_json, recipes_json, snapshot)
+        self._migrate_ingredients()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Serializes writers and yields a MealsBatch whose writes commit (or
+        roll back) as one unit.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            batch = MealsBatch(self._conn)
+            try:
+                yield batch
+                if batch.dates or batch.recipes:
+                    self._conn.execute(
+                        "INSERT INTO meta (key, value) VALUES ('change_seq', '1') "
+                        "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._invalidate(batch)
+        # Outside the lock, so listeners may read the store or take their own locks
+        self._notify(batch)
+
+    def subscribe(self, listener):
+        """Calls ``listener(batch)`` after every committed transaction."""
+        self._listeners.append(listener)
+
+    def _notify(self, batch):
+        for listener in self._listeners:
+            try:
+                listener(batch)
+            except Exception:
+                logging.exception("Error in meals store listener")
+
+    def _invalidate(self, batch):
+        if batch.recipes:
+            self.recipes_version += 1
+            self._views.pop("recipes", None)
+            self._views.pop("favorites", None)
+        if batch.dates:
+            self.meals_version += 1
+            self._views.pop("all_meals", None)
+            for month in {date[:7] for date in batch.dates}:
+                self._months.pop(month, None)
+                self._month_versions[month] = self._month_versions.get(month, 0) + 1
+
+    def _view(self, name, build):
+        with self._lock:
+            if name not in self._views:
+                self._views[name] = build()
+            return self._views[name]
+
+    def month_version(self, month):
+        return self._month_versions.get(month, 0)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _migrate_json(self, meals_json, recipes_json, snapshot=None):
+        with self.transaction() as batch:
+            if batch.conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone():
+                return
+            meals, recipes = {}, {}
+            try:
+                if snapshot and Path(snapshot).exists():
+                    data = json.loads(Path(snapshot).read_text())
+                    meals, recipes = data["meals"], data["recipes"]
+                else:
+                    if meals_json and Path(meals_json).exists():
+                        meals = json.loads(Path(meals_json).read_text())
+                    if recipes_json and Path(recipes_json).exists():
+                        recipes = json.loads(Path(recipes_json).read_text())
+            except (OSError, ValueError, KeyError):
+                # Leave the flag unset so the import is retried on next start
+                logging.exception("Error reading legacy meals JSON; skipping migration")
+                return
+            for recipe_uuid, recipe in recipes.items():
+                batch.put_recipe(dict(recipe, uuid=recipe.get("uuid") or recipe_uuid))
+            slots = 0
+            for month in meals.values():
+                for date, day in month.items():
+                    for meal_type, slot in day.items():
+                        if isinstance(slot, dict):
+                            batch.set_slot(date, meal_type, slot)
+                            slots += 1
+            batch.conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+            logging.info(f"Migrated {slots} meal slots and {len(recipes)} recipes to {self.path}")
+
+    def _migrate_ingredients(self):
+        # Re-parse stored recipes written before (or by an older) ingredient parser
+        with self.transaction() as batch:
+            row = batch.conn.execute("SELECT value FROM meta WHERE key = 'ingredients_parser'").fetchone()
+            if row and row[0] == str(PARSER_VERSION):
+                return
+            rows = batch.conn.execute("SELECT data FROM recipes ORDER BY rowid").fetchall()
+            for (data,) in rows:
+                batch.put_recipe(json.loads(data))
+            batch.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('ingredients_parser', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (str(PARSER_VERSION),),
+            )
+            logging.info(f"Parsed ingredients for {len(rows)} recipes")
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def export_snapshot(self, path):
+        """
+        Atomically writes {"meals", "recipes"} to ``path`` if anything changed
+        since the last export, then checkpoints the WAL. Returns True if a
+        snapshot was written.
+        """
+        with self._lock:
+            seq = int(self._meta("change_seq") or 0)
+            exported = self._meta("snapshot_seq")
+            if exported is not None and int(exported) >= seq and Path(path).exists():
+                return False
+            snapshot = {"meals": self.all_meals(), "recipes": self.all_recipes()}
+        # Views are immutable, so the slow write can happen outside the lock
+        atomic_write_json(path, snapshot, indent=2)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('snapshot_seq', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (str(seq),),
+            )
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return True
+
+    # --- Meal slots ---
+
+    def set_slot(self, date, meal_type, slot):
+        with self.transaction() as batch:
+            batch.set_slot(date, meal_type, slot)
+
+    def clear_slot(self, date, meal_type):
+        with self.transaction() as batch:
+            return batch.clear_slot(date, meal_type)
+
+    @staticmethod
+    def _nest(rows):
+        # Same shape as the legacy file: {month: {date: {meal_type: slot}}}
+        data = {}
+        for row in rows:
+            data.setdefault(row[0], {}).setdefault(row[1], {})[row[2]] = json.loads(row[3])
+        return data
+
+    def all_meals(self):
+        return self._view(
+            "all_meals",
+            lambda: self._nest(self._query("SELECT month, date, meal_type, data FROM meal_slots ORDER BY date")),
+        )
+
+    def month_meals(self, month):
+        """{date: {meal_type: slot}} for one YYYY-MM month."""
+        with self._lock:
+            if month not in self._months:
+                rows = self._query(
+                    "SELECT month, date, meal_type, data FROM meal_slots WHERE month = ? ORDER BY date", (month,)
+                )
+                if not rows:
+                    # Don't let probes of empty months grow the cache
+                    return {}
+                self._months[month] = self._nest(rows).get(month, {})
+            return self._months[month]
+
+    def meals_in_range(self, start, end):
+        """{month: {date: slots}} for dates between ``start`` and ``end`` inclusive."""
+        result = {}
+        for month in months_between(start[:7], end[:7]):
+            days = {date: day for date, day in self.month_meals(month).items() if start <= date <= end}
+            if days:
+                result[month] = days
+        return result
+
+    def get_day(self, date):
+        return self.month_meals(date[:7]).get(date, {})
+
+    # --- Recipes ---
+
+    def put_recipe(self, recipe):
+        with self.transaction() as batch:
+            batch.put_recipe(recipe)
+
+    def update_recipe(self, recipe_uuid, fields):
+        with self.transaction() as batch:
+            return batch.update_recipe(recipe_uuid, fields)
+
+    def delete_recipe(self, recipe_uuid):
+        with self.transaction() as batch:
+            return batch.delete_recipe(recipe_uuid)
+
+    def all_recipes(self):
+        """uuid -> recipe map, in insertion order."""
+        return self._view(
+            "recipes",
+            lambda: {
+                recipe_uuid: json.loads(data)
+                for recipe_uuid, data in self._query("SELECT uuid, data FROM recipes ORDER BY rowid")
+            },
+        )
+
+    def get_recipe(self, recipe_uuid):
+        return self.all_recipes().get(recipe_uuid)
+
+    def favorite_recipes(self):
+        """Favorite recipes sorted by title."""
+        return self._view(
+            "favorites",
+            lambda: sorted(
+                (r for r in self.all_recipes().values() if r.get("isFavorite")),
+                key=lambda r: ((r.get("title") or "").lower(), r.get("uuid")),
+            ),
+        )
@@ -1,14 +1,159 @@
 from flask import Blueprint, jsonify
-import requests
+from collections import deque
+from pathlib import Path
+import logging
+import os
+import socket
+import threading
+import time
 
 network_bp = Blueprint("network", __name__, url_prefix="/api/network")
 
 
+def _parse_targets(spec):
+    """Parses "host:port,host:port" into (host, port) pairs."""
+    targets = []
+    for item in spec.split(","):
+        host, _, port = item.strip().rpartition(":")
+        if host and port.isdigit():
+            targets.append((host.strip("[]"), int(port)))
+    return targets
+
+
+def link_up(net_dir=Path("/sys/class/net")):
+    """
+    True if any non-loopback interface is up, False if none is, or None
+    when the kernel doesn't expose link state (non-Linux).
+    """
+    if not net_dir.is_dir():
+        return None
+    for iface in net_dir.iterdir():
+        if iface.name == "lo":
+            continue
+        try:
+            if (iface / "operstate").read_text().strip() in ("up", "unknown") and (
+                iface / "carrier"
+            ).read_text().strip() == "1":
+                return True
+        except OSError:
+            # carrier can't be read while the interface is administratively down
+            continue
+    return False
+
+
+class ConnectivityMonitor:
+    """
+    Cheap connectivity probes on a daemon thread.
+
+    Each round checks kernel link state, resolves ``dns_name`` and opens a
+    TCP connection to each target until one succeeds, recording the connect
+    latency. The reported state only flips after ``fail_threshold``
+    consecutive failed rounds (or ``recover_threshold`` good ones), and the
+    last ``history`` rounds give the latency and loss figures.
+    """
+
+    def __init__(self, targets, dns_name=None, interval=10, timeout=2, fail_threshold=2, recover_threshold=1, history=30):
+        self.targets = targets
+        self.dns_name = dns_name
+        self.interval = interval
+        self.timeout = timeout
+        self.fail_threshold = fail_threshold
+        self.recover_threshold = recover_threshold
+        self.history = deque(maxlen=history)  # (timestamp, latency_ms or None)
+        self.online = None
+        self.link = None
+        self.dns = None
+        self._streak = 0  # consecutive rounds disagreeing with self.online
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="connectivity", daemon=True)
+                self._thread.start()
+
+    def _resolve(self):
+        if not self.dns_name:
+            return None
+        try:
+            socket.getaddrinfo(self.dns_name, None)
+            return True
+        except OSError:
+            return False
+
+    def _connect(self):
+        """Connect latency in ms to the first reachable target, or None."""
+        for host, port in self.targets:
+            started = time.monotonic()
+            try:
+                with socket.create_connection((host, port), timeout=self.timeout):
+                    return (time.monotonic() - started) * 1000
+            except OSError:
+                continue
+        return None
+
+    def probe(self):
+        """Runs one probe round and updates the debounced state."""
+        link = link_up()
+        # No link means no route out; skip the network probes
+        dns = self._resolve() if link is not False else False
+        latency = self._connect() if link is not False else None
+        ok = latency is not None
+        with self._lock:
+            self.link = link
+            self.dns = dns
+            self.history.append((time.time(), latency))
+            if self.online is None:
+                self.online = ok
+            elif ok != self.online:
+                self._streak += 1
+                if self._streak >= (self.recover_threshold if ok else self.fail_threshold):
+                    self.online = ok
+                    self._streak = 0
+                    logging.info(f"Connectivity changed: {'online' if ok else 'offline'}")
+            else:
+                self._streak = 0
+
+    def _run(self):
+        while True:
+            try:
+                self.probe()
+            except Exception:
+                logging.exception("Error probing connectivity")
+            time.sleep(self.interval)
+
+    def stats(self):
+        with self._lock:
+            latencies = [ms for _, ms in self.history if ms is not None]
+            rounds = len(self.history)
+            return {
+                "network": "unknown" if self.online is None else ("online" if self.online else "offline"),
+                "link": self.link,
+                "dns": self.dns,
+                "latency_ms": round(self.history[-1][1]) if rounds and self.history[-1][1] is not None else None,
+                "avg_latency_ms": round(sum(latencies) / len(latencies)) if latencies else None,
+                "loss_pct": round(100 * (rounds - len(latencies)) / rounds) if rounds else None,
+            }
+
+
+_MONITOR = ConnectivityMonitor(
+    _parse_targets(os.getenv("NETWORK_PROBE_TARGETS", "1.1.1.1:443,8.8.8.8:53")),
+    dns_name=os.getenv("NETWORK_PROBE_DNS", "www.google.com") or None,
+    interval=float(os.getenv("NETWORK_PROBE_INTERVAL", "10")),
+)
+
+
+# Change every round; pushing them would defeat change-only updates
+_VOLATILE = ("latency_ms", "avg_latency_ms")
+
+
+def network_payload():
+    _MONITOR.start()
+    return {k: v for k, v in _MONITOR.stats().items() if k not in _VOLATILE}
+
+
 @network_bp.route("/data")
 def get_network():
-    try:
-        requests.get("https://www.google.com", timeout=3)
-        status = "online"
-    except requests.RequestException:
-        status = "offline"
-    return jsonify({"status": "ok", "data": {"network": status}})
+    _MONITOR.start()
+    return jsonify({"status": "ok", "data": _MONITOR.stats()})
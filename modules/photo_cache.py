@@ -0,0 +1,120 @@
+import io
+import json
+import time
+import hashlib
+import logging
+from pathlib import Path
+
+import requests
+
+from modules.storage import atomic_write_bytes, atomic_write_json
+
+# Pillow is optional; without it photos are cached as downloaded
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+
+class PhotoCache:
+    """
+    Local content-addressed cache of shared-album photos.
+
+    Each album photo is downloaded once, downscaled to the panel size and
+    stored under the hash of its original bytes. The album is re-listed only
+    every ``list_ttl`` seconds (or while downloads are still pending), and
+    ``next_photo`` rotates through the cached files without touching iCloud.
+    Photos that fail to download are skipped for ``retry_after`` seconds.
+    """
+
+    def __init__(self, directory, size=(800, 480), list_ttl=6 * 3600, batch=10, retry_after=3600):
+        self.directory = Path(directory)
+        self.size = size
+        self.list_ttl = list_ttl
+        self.batch = batch  # max new downloads per sync
+        self.retry_after = retry_after
+        self.failed = {}  # album photo id -> time a download may be retried
+        self.index = None  # album photo id -> cached file name
+        self.listed_at = 0
+        self.pending = False
+        self.position = 0
+        self._session = requests.Session()
+
+    def _ensure_index(self):
+        if self.index is not None:
+            return
+        try:
+            self.index = json.loads((self.directory / "index.json").read_text())
+        except (OSError, ValueError):
+            self.index = {}
+
+    def needs_listing(self):
+        return self.index is None or self.pending or time.time() - self.listed_at > self.list_ttl
+
+    def _derive(self, content):
+        if Image is None:
+            return content
+        with Image.open(io.BytesIO(content)) as im:
+            im = ImageOps.exif_transpose(im)
+            im.thumbnail(self.size)
+            out = io.BytesIO()
+            im.convert("RGB").save(out, "JPEG", quality=80, optimize=True, progressive=True)
+            return out.getvalue()
+
+    def _ingest(self, url):
+        resp = self._session.get(url, timeout=(5, 30))
+        resp.raise_for_status()
+        digest = hashlib.sha256(resp.content).hexdigest()[:32]
+        name = f"{digest}.jpg"
+        path = self.directory / name
+        if not path.exists():
+            atomic_write_bytes(path, self._derive(resp.content))
+        return name
+
+    def sync(self, photos):
+        """
+        Reconciles the cache with an album listing (dicts with downloadUrl):
+        downloads up to ``batch`` new photos and drops removed ones.
+        """
+        self._ensure_index()
+        listed = {}
+        for photo in photos:
+            url = photo.get("downloadUrl")
+            if not url:
+                continue
+            photo_id = photo.get("photoGuid") or photo.get("guid") or url.split("?", 1)[0]
+            listed[photo_id] = url
+        for photo_id in set(self.index) - set(listed):
+            self.index.pop(photo_id)
+        now = time.time()
+        self.failed = {photo_id: at for photo_id, at in self.failed.items() if photo_id in listed and at > now}
+        # Only photos that can be fetched now; recently failed ones wait out retry_after
+        new = [
+            (photo_id, url)
+            for photo_id, url in listed.items()
+            if photo_id not in self.index and photo_id not in self.failed
+        ]
+        for photo_id, url in new[: self.batch]:
+            try:
+                self.index[photo_id] = self._ingest(url)
+            except Exception:
+                logging.exception("Error caching shared album photo")
+                self.failed[photo_id] = now + self.retry_after
+        self.pending = len(new) > self.batch
+        self.listed_at = time.time()
+        atomic_write_json(self.directory / "index.json", self.index)
+        # Remove derivatives no longer referenced by the album
+        keep = set(self.index.values())
+        for path in self.directory.glob("*.jpg"):
+            if path.name not in keep:
+                path.unlink(missing_ok=True)
+
+    def next_photo(self):
+        """Next cached file name in rotation, or None if the cache is empty."""
+        self._ensure_index()
+        names = sorted(set(self.index.values()))
+        if not names:
+            return None
+        name = names[self.position % len(names)]
+        self.position += 1
+        return name
@@ -0,0 +1,175 @@
+import hashlib
+import heapq
+import itertools
+import logging
+import random
+import time
+
+
+def structural_hash(obj):
+    """
+    Digest of a nested dict/list payload, used to detect changes between
+    ticks without keeping or deep-comparing the previous value.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    _feed(digest, obj)
+    return digest.digest()
+
+
+def _feed(digest, obj):
+    # Length-prefixed and type-tagged, so distinct payloads can't produce the
+    # same byte stream (and -1/-2 don't collide the way built-in hash() does)
+    if isinstance(obj, dict):
+        digest.update(b"{%d:" % len(obj))
+        for key in sorted(obj, key=str):
+            _feed(digest, key)
+            _feed(digest, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        digest.update(b"[%d:" % len(obj))
+        for value in obj:
+            _feed(digest, value)
+    else:
+        data = repr(obj).encode()
+        digest.update(b"%s%d:%s" % (type(obj).__name__.encode(), len(data), data))
+
+
+class Scheduler:
+    """
+    Single-clock cooperative scheduler for the background data sources.
+
+    Every source lives in one priority queue keyed by its next due time, so the
+    process wakes once per due slot instead of once per source. Sources that
+    come due within ``coalesce`` seconds of each other run in the same wakeup.
+    """
+
+    def __init__(self, sleep=time.sleep, clock=time.monotonic, coalesce=0.25):
+        self._sleep = sleep
+        self._clock = clock
+        self._coalesce = coalesce
+        self._queue = []  # (due, seq, name)
+        self._seq = itertools.count()
+        self._sources = {}
+        self._wakeups = 0
+
+    def add(self, name, func, interval, jitter=0.0, max_backoff=None, delay=0.0, next_run=None):
+        """
+        Register ``func`` to run every ``interval`` seconds.
+
+        ``jitter`` spreads each run by up to +/- that many seconds; after a
+        failure the interval doubles per consecutive error, capped at
+        ``max_backoff`` (default 8x the interval).
+
+        ``next_run``, if given, returns the seconds until the next run (e.g.
+        the next minute boundary) and replaces the fixed interval while the
+        source is healthy. Such sources never run early to share a wakeup.
+        """
+        self._sources[name] = {
+            "func": func,
+            "interval": interval,
+            "next_run": next_run,
+            "jitter": jitter,
+            "max_backoff": max_backoff if max_backoff is not None else interval * 8,
+            "failures": 0,
+            "runs": 0,
+            "errors": 0,
+            "total_time": 0.0,
+            "last_time": None,
+            "max_time": 0.0,
+            "last_run": None,
+            "next_due": None,
+        }
+        if next_run is not None and not delay:
+            delay = next_run()
+        self._push(name, self._clock() + delay)
+
+    def _push(self, name, due):
+        self._sources[name]["next_due"] = due
+        heapq.heappush(self._queue, (due, next(self._seq), name))
+
+    def _next_delay(self, src):
+        if src["next_run"] is not None and not src["failures"]:
+            return max(src["next_run"](), 0.0)
+        delay = src["interval"]
+        if src["failures"]:
+            delay = min(delay * 2 ** src["failures"], src["max_backoff"])
+        if src["jitter"]:
+            delay += random.uniform(-src["jitter"], src["jitter"])
+        return max(delay, 0.0)
+
+    def _run(self, name):
+        src = self._sources[name]
+        started = self._clock()
+        try:
+            src["func"]()
+            src["failures"] = 0
+        except Exception:
+            logging.exception(f"Scheduled source {name} failed")
+            src["failures"] += 1
+            src["errors"] += 1
+        elapsed = self._clock() - started
+        src["runs"] += 1
+        src["total_time"] += elapsed
+        src["last_time"] = elapsed
+        src["max_time"] = max(src["max_time"], elapsed)
+        src["last_run"] = time.time()
+
+    def run_pending(self):
+        """
+        Run every source that is due (or due within the coalesce window) and
+        return the number of seconds until the next one.
+        """
+        now = self._clock()
+        horizon = now + self._coalesce
+        batch = []
+        early = []
+        while self._queue and self._queue[0][0] <= horizon:
+            entry = heapq.heappop(self._queue)
+            # Aligned sources must not fire before their boundary
+            if entry[0] > now and self._sources[entry[2]]["next_run"] is not None:
+                early.append(entry)
+            else:
+                batch.append(entry)
+        for entry in early:
+            heapq.heappush(self._queue, entry)
+        if batch:
+            self._wakeups += 1
+        for due, _seq, name in batch:
+            self._run(name)
+            # Schedule from the nominal due time so periodic sources don't drift
+            src = self._sources[name]
+            delay = self._next_delay(src)
+            if src["next_run"] is not None and not src["failures"]:
+                # Already measured from now against the wall clock
+                next_due = self._clock() + delay
+            else:
+                next_due = due + delay
+                if next_due <= self._clock():
+                    next_due = self._clock() + delay
+            self._push(name, next_due)
+        if not self._queue:
+            return None
+        return max(self._queue[0][0] - self._clock(), 0.0)
+
+    def run_forever(self):
+        while True:
+            wait = self.run_pending()
+            self._sleep(wait if wait is not None else 1)
+
+    def stats(self):
+        """Per-source run counts and timings, suitable for jsonify."""
+        now = self._clock()
+        sources = {}
+        for name, src in self._sources.items():
+            sources[name] = {
+                "interval": src["interval"],
+                "runs": src["runs"],
+                "errors": src["errors"],
+                "consecutive_failures": src["failures"],
+                "last_duration": src["last_time"],
+                "avg_duration": src["total_time"] / src["runs"] if src["runs"] else None,
+                "max_duration": src["max_time"],
+                "total_duration": src["total_time"],
+                "last_run": src["last_run"],
+                "next_due_in": src["next_due"] - now if src["next_due"] is not None else None,
+            }
+        return {"wakeups": self._wakeups, "sources": sources}
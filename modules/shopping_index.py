@@ -0,0 +1,128 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+from modules.ingredients import format_amount, parse_ingredients
+
+
+def ingredient_records(recipe):
+    """(key, base unit, base quantity, item) records for one recipe."""
+    parsed = recipe.get("parsed_ingredients")
+    if parsed is None:
+        parsed = parse_ingredients(recipe.get("ingredients"))
+    return [(p["key"], p["base_unit"], p["base_quantity"] or 0, p["item"]) for p in parsed]
+
+
+def _scale(slot, recipe):
+    try:
+        servings = float(slot.get("servings", 1) or 1)
+        default = float(recipe.get("default_servings", 1) or 1)
+    except (TypeError, ValueError):
+        return 1
+    return servings / default
+
+
+class ShoppingIndex:
+    """
+    Per-day ingredient totals kept in step with a MealsStore.
+
+    Recipe ingredients (parsed and normalized to ml/g/count units when the
+    recipe was written) are turned into records once and reused until the
+    recipe is written again, so totals are plain sums. Each planned day holds its
+    summed, serving-scaled totals; commits only mark the touched days (and
+    the days using a touched recipe) for recomputation, and a range query
+    sums the days found by bisecting the sorted date index.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self._records = {}  # recipe uuid -> records, or None if the recipe is missing
+        self._names = {}  # ingredient key -> display name (first seen)
+        self._days = None  # date -> {(item, unit): quantity}
+        self._dates = []  # sorted dates present in _days
+        self._day_recipes = {}  # date -> recipe uuids planned that day
+        self._recipe_days = {}  # recipe uuid -> dates it is planned on
+        self._dirty = set()
+        store.subscribe(self._on_commit)
+
+    def _on_commit(self, batch):
+        with self._lock:
+            for recipe_uuid in batch.recipes:
+                self._records.pop(recipe_uuid, None)
+                self._dirty.update(self._recipe_days.get(recipe_uuid, ()))
+            self._dirty.update(batch.dates)
+
+    def _recipe_records(self, recipe_uuid):
+        if recipe_uuid not in self._records:
+            recipe = self.store.get_recipe(recipe_uuid)
+            self._records[recipe_uuid] = ingredient_records(recipe) if recipe else None
+            for key, _, _, item in self._records[recipe_uuid] or ():
+                self._names.setdefault(key, item)
+        return self._records[recipe_uuid]
+
+    def _index_day(self, date, day):
+        for recipe_uuid in self._day_recipes.pop(date, ()):
+            dates = self._recipe_days.get(recipe_uuid)
+            if dates is not None:
+                dates.discard(date)
+                if not dates:
+                    del self._recipe_days[recipe_uuid]
+        totals = {}
+        used = set()
+        for slot in day.values():
+            if not isinstance(slot, dict) or not slot.get("recipe_uuid"):
+                continue
+            recipe_uuid = slot["recipe_uuid"]
+            used.add(recipe_uuid)
+            records = self._recipe_records(recipe_uuid)
+            if not records:
+                continue
+            factor = _scale(slot, self.store.get_recipe(recipe_uuid))
+            for key, unit, quantity, _ in records:
+                totals[(key, unit)] = totals.get((key, unit), 0) + quantity * factor
+        for recipe_uuid in used:
+            self._recipe_days.setdefault(recipe_uuid, set()).add(date)
+        if used:
+            self._day_recipes[date] = used
+        present = date in self._days
+        if totals:
+            self._days[date] = totals
+            if not present:
+                insort(self._dates, date)
+        elif present:
+            del self._days[date]
+            self._dates.pop(bisect_left(self._dates, date))
+
+    def _refresh(self):
+        if self._days is None:
+            self._days = {}
+            self._dirty.clear()
+            for month in self.store.all_meals().values():
+                for date, day in month.items():
+                    self._index_day(date, day)
+            return
+        while self._dirty:
+            date = self._dirty.pop()
+            self._index_day(date, self.store.get_day(date))
+
+    def totals(self, start=None, end=None):
+        """
+        Summed ingredients for planned days between ``start`` and ``end``
+        (YYYY-MM-DD, inclusive; either may be None for an open range).
+        """
+        with self._lock:
+            self._refresh()
+            lo = bisect_left(self._dates, start) if start else 0
+            hi = bisect_right(self._dates, end) if end else len(self._dates)
+            aggregated = {}
+            for date in self._dates[lo:hi]:
+                for key, quantity in self._days[date].items():
+                    aggregated[key] = aggregated.get(key, 0) + quantity
+            names = dict(self._names)
+        result = []
+        for (key, unit), quantity in aggregated.items():
+            item = names.get(key, key)
+            amount = format_amount(quantity, unit)
+            text = f"{amount} {item}" if amount else item
+            result.append({"item": item, "unit": unit, "quantity": quantity, "text": text})
+        return result
@@ -0,0 +1,305 @@
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.storage import atomic_write_json
+
+API_URL = "https://api.spoonacular.com"
+_TIMEOUT = (3.05, 10)
+
+
+class RateLimited(Exception):
+    """Raised when the local request budget is used up."""
+
+
+class TokenBucket:
+    """Allows bursts of ``capacity`` requests, refilled at ``rate`` per second."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class PersistentLRU:
+    """
+    LRU cache with a per-entry TTL, saved to one JSON file on every insert
+    and loaded lazily. Expired entries are kept as a fallback for when the
+    API can't be reached, until pushed out by newer ones.
+    """
+
+    def __init__(self, path, max_entries, ttl):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = None  # key -> [stored_at, value]
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = OrderedDict()
+        try:
+            with open(self.path) as f:
+                for key, entry in json.load(f).items():
+                    self._entries[key] = entry
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError):
+            logging.exception(f"Error loading {self.path}; starting empty")
+
+    def get(self, key, allow_stale=False):
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None or (not allow_stale and time.time() - entry[0] > self.ttl):
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._load()
+            self._entries[key] = [time.time(), value]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            try:
+                atomic_write_json(self.path, self._entries)
+            except OSError:
+                logging.exception(f"Error writing {self.path}")
+
+    def values(self):
+        with self._lock:
+            self._load()
+            return [entry[1] for entry in self._entries.values()]
+
+
+def _tokens(text):
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    return [w[:-1] if len(w) > 3 and w.endswith("s") and not w.endswith("ss") else w for w in words]
+
+
+class SearchIndex:
+    """
+    In-memory inverted index over recipe documents.
+
+    Every query word must match a document token (the last word as a
+    prefix, so partial input still finds results); title matches rank
+    above ingredient and tag matches.
+    """
+
+    def __init__(self):
+        self._docs = {}  # doc id -> (title tokens, all tokens, document)
+        self._postings = {}  # token -> doc ids
+        self._lock = threading.Lock()
+
+    def add(self, doc_id, title, text, doc):
+        with self._lock:
+            self._remove(doc_id)
+            title_tokens = set(_tokens(title))
+            all_tokens = title_tokens | set(_tokens(text))
+            for token in all_tokens:
+                self._postings.setdefault(token, set()).add(doc_id)
+            self._docs[doc_id] = (title_tokens, all_tokens, doc)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        if doc_id not in self._docs:
+            return
+        _, all_tokens, _ = self._docs.pop(doc_id)
+        for token in all_tokens:
+            self._postings[token].discard(doc_id)
+            if not self._postings[token]:
+                del self._postings[token]
+
+    def search(self, query, limit=10):
+        words = _tokens(query)
+        if not words:
+            return []
+        with self._lock:
+            matches = None
+            scores = {}
+            for i, word in enumerate(words):
+                if i == len(words) - 1:
+                    tokens = [t for t in self._postings if t.startswith(word)]
+                else:
+                    tokens = [word] if word in self._postings else []
+                ids = set().union(*(self._postings[t] for t in tokens)) if tokens else set()
+                matches = ids if matches is None else matches & ids
+                for doc_id in ids:
+                    title_hit = any(t in self._docs[doc_id][0] for t in tokens)
+                    scores[doc_id] = scores.get(doc_id, 0) + (2 if title_hit else 1)
+            ranked = sorted(matches or (), key=lambda d: (-scores[d], self._docs[d][2].get("title") or ""))
+            return [self._docs[d][2] for d in ranked[:limit]]
+
+
+class SpoonacularClient:
+    """
+    Caching proxy for the Spoonacular search and recipe-information calls.
+
+    Responses are kept in disk-backed LRU caches, identical concurrent
+    requests share one upstream call, and a token bucket caps the request
+    rate. Everything fetched is also added to a local search index, which
+    answers searches when there is no API key, the budget is exhausted or
+    the API is unreachable.
+    """
+
+    def __init__(self, api_key, cache_dir, rate=0.5, burst=5):
+        self.api_key = api_key
+        self.searches = PersistentLRU(cache_dir / "search.json", max_entries=200, ttl=24 * 3600)
+        self.details = PersistentLRU(cache_dir / "recipes.json", max_entries=500, ttl=7 * 24 * 3600)
+        self.bucket = TokenBucket(rate, burst)
+        self.index = SearchIndex()
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._indexed = False
+
+    def _ensure_index(self):
+        with self._lock:
+            if self._indexed:
+                return
+            for results in self.searches.values():
+                self._index_results(results)
+            for recipe in self.details.values():
+                self._index_recipe(recipe)
+            self._indexed = True
+
+    def _index_results(self, results):
+        for r in results:
+            # Keep the richer entry when the full recipe is already indexed
+            if f"sp:{r.get('id')}" in self.index:
+                continue
+            self.index.add(f"sp:{r.get('id')}", r.get("title"), "", r)
+
+    def _index_recipe(self, recipe):
+        summary = {"id": recipe.get("id"), "title": recipe.get("title"), "image": recipe.get("image")}
+        text = " ".join(recipe.get("ingredients", []) + recipe.get("tags", []))
+        self.index.add(f"sp:{recipe.get('id')}", recipe.get("title"), text, summary)
+
+    def _get(self, path, params):
+        if not self.bucket.try_acquire():
+            raise RateLimited(path)
+        # Key in a header, never the URL, so it can't leak into error messages or logs
+        resp = self._session.get(
+            f"{API_URL}{path}", params=params, headers={"x-api-key": self.api_key}, timeout=_TIMEOUT
+        )
+        if resp.status_code in (402, 429):
+            raise RateLimited(f"{path}: HTTP {resp.status_code}")
+        resp.raise_for_status()
+        return resp.json()
+
+    def _single_flight(self, key, fetch):
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result(timeout=sum(_TIMEOUT))
+        try:
+            result = fetch()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def search(self, query, number=10):
+        """[{id, title, image}] for ``query``, from cache, the API or the local index."""
+        self._ensure_index()
+        key = " ".join(_tokens(query))
+        cached = self.searches.get(key)
+        if cached is not None:
+            return cached
+        if not self.api_key:
+            return self.index.search(query, number)
+
+        def fetch():
+            data = self._get("/recipes/complexSearch", {"query": query, "number": number})
+            results = [
+                {"id": r.get("id"), "title": r.get("title"), "image": r.get("image")}
+                for r in data.get("results", [])
+            ]
+            self.searches.put(key, results)
+            self._index_results(results)
+            return results
+
+        try:
+            return self._single_flight(("search", key), fetch)
+        except RateLimited:
+            logging.warning("Spoonacular budget exhausted; answering search locally")
+        except TimeoutError:
+            logging.warning("Timed out waiting on a shared Spoonacular search; answering locally")
+        except (requests.RequestException, ValueError):
+            logging.exception("Error searching Spoonacular")
+        stale = self.searches.get(key, allow_stale=True)
+        return stale if stale is not None else self.index.search(query, number)
+
+    def recipe(self, recipe_id):
+        """
+        {title, ingredients, tags, source} for a Spoonacular recipe id.
+        Raises RateLimited or requests errors when it isn't cached.
+        """
+        self._ensure_index()
+        key = str(recipe_id)
+        cached = self.details.get(key)
+        if cached is not None:
+            return cached
+
+        def fetch():
+            data = self._get(f"/recipes/{key}/information", {})
+            recipe = {
+                "id": data.get("id"),
+                "title": data.get("title", ""),
+                "image": data.get("image"),
+                "ingredients": [
+                    i.get("originalString") or i.get("original") or i.get("name", "")
+                    for i in data.get("extendedIngredients", [])
+                ],
+                "tags": sorted(set(data.get("dishTypes", []) + data.get("diets", []))),
+                "source": "spoonacular",
+            }
+            self.details.put(key, recipe)
+            self._index_recipe(recipe)
+            return recipe
+
+        try:
+            return self._single_flight(("recipe", key), fetch)
+        except (RateLimited, TimeoutError, requests.RequestException, ValueError):
+            stale = self.details.get(key, allow_stale=True)
+            if stale is None:
+                raise
+            logging.warning(f"Serving cached Spoonacular recipe {key} after a failed refresh")
+            return stale
@@ -0,0 +1,67 @@
+import os
+import json
+import time
+import tempfile
+from pathlib import Path
+
+# Runtime caches (weather, photos, API responses); not tracked in git
+CACHE_DIR = Path(__file__).resolve().parent.parent / os.getenv("FAMILYDASH_CACHE_DIR", "cache")
+
+
+def atomic_write_bytes(path, data):
+    """
+    Writes ``data`` to a temp file in the same directory, fsyncs it and renames
+    it over ``path``, so readers never see a partially written file.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        os.chmod(tmp, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path, obj, **dump_kwargs):
+    """Atomically writes ``obj`` as JSON to ``path`` (see atomic_write_bytes)."""
+    atomic_write_bytes(path, json.dumps(obj, **dump_kwargs).encode())
+
+
+def evict(directory, max_age=None, max_bytes=None, pattern="*"):
+    """
+    Deletes files in ``directory`` older than ``max_age`` seconds, then the
+    oldest remaining ones until their total size is under ``max_bytes``.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return
+    now = time.time()
+    entries = []
+    for path in directory.glob(pattern):
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if not path.is_file():
+            continue
+        if max_age is not None and now - st.st_mtime > max_age:
+            path.unlink(missing_ok=True)
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    if max_bytes is None:
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
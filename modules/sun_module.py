@@ -1,16 +1,114 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from astral import LocationInfo
-from astral.sun import sun
-from datetime import date
+from astral.sun import dawn, dusk, sun, sunrise, sunset
+from datetime import date, datetime, timedelta, timezone
+import logging
 import os
 
 sun_bp = Blueprint("sun", __name__, url_prefix="/api/sun")
 
+_EVENTS = ("dawn", "sunrise", "sunset", "dusk")
+_EVENT_FUNCS = {"dawn": dawn, "sunrise": sunrise, "sunset": sunset, "dusk": dusk}
+# Phase that starts at each event
+_PHASES = {"dawn": "dawn", "sunrise": "day", "sunset": "dusk", "dusk": "night"}
+# (lat, lon, date) -> {event: aware datetime or None}; one entry per location and day
+_SUN_CACHE = {}
+_SUN_CACHE_MAX = 1024
+# Re-check at least this often (clock or location changes)
+_MAX_WAIT = 6 * 3600
+
+
+def _location():
+    return float(os.getenv("LATITUDE", 0)), float(os.getenv("LONGITUDE", 0))
+
+
+def _sun_day(lat, lon, day):
+    key = (lat, lon, day)
+    times = _SUN_CACHE.get(key)
+    if times is None:
+        observer = LocationInfo(latitude=lat, longitude=lon).observer
+        try:
+            times = {k: v for k, v in sun(observer, date=day).items() if k in _EVENTS}
+        except ValueError:
+            # Polar day/night: compute what exists, leave the rest None
+            times = {}
+            for event in _EVENTS:
+                try:
+                    times[event] = _EVENT_FUNCS[event](observer, date=day)
+                except ValueError:
+                    times[event] = None
+        if len(_SUN_CACHE) >= _SUN_CACHE_MAX:
+            # Oldest days were computed first
+            for old in list(_SUN_CACHE)[: _SUN_CACHE_MAX // 2]:
+                del _SUN_CACHE[old]
+        _SUN_CACHE[key] = times
+    return times
+
+
+def sun_table(start, days):
+    """Sun events for ``days`` consecutive dates from ``start``, served from the per-day cache."""
+    lat, lon = _location()
+    rows = []
+    for i in range(days):
+        day = start + timedelta(days=i)
+        times = _sun_day(lat, lon, day)
+        rows.append({"date": day.isoformat(), **{e: times[e].isoformat() if times[e] else None for e in _EVENTS}})
+    return rows
+
+
+def _upcoming(now):
+    """(time, event) pairs from the day before ``now`` through the day after, in time order."""
+    lat, lon = _location()
+    today = now.astimezone().date()
+    events = []
+    for offset in (-1, 0, 1):
+        times = _sun_day(lat, lon, today + timedelta(days=offset))
+        events.extend((t, e) for e, t in times.items() if t is not None)
+    return sorted(events)
+
+
+def seconds_until_transition():
+    """Seconds until the next dawn/sunrise/sunset/dusk or local midnight."""
+    now = datetime.now(timezone.utc)
+    midnight = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()).astimezone(timezone.utc)
+    candidates = [t for t, _ in _upcoming(now) if t > now] + [midnight]
+    return min(max((min(candidates) - now).total_seconds(), 1), _MAX_WAIT)
+
+
+def sun_payload():
+    lat, lon = _location()
+    now = datetime.now(timezone.utc)
+    s = _sun_day(lat, lon, date.today())
+    phase = "night"
+    for t, event in _upcoming(now):
+        if t <= now:
+            phase = _PHASES[event]
+    return {
+        "sunrise": s["sunrise"].isoformat() if s["sunrise"] else None,
+        "sunset": s["sunset"].isoformat() if s["sunset"] else None,
+        "dawn": s["dawn"].isoformat() if s["dawn"] else None,
+        "dusk": s["dusk"].isoformat() if s["dusk"] else None,
+        "phase": phase,
+    }
+
 
 @sun_bp.route("/data")
 def get_sun():
-    lat = float(os.getenv("LATITUDE", 0))
-    lon = float(os.getenv("LONGITUDE", 0))
-    loc = LocationInfo(latitude=lat, longitude=lon)
-    s = sun(loc.observer, date=date.today())
-    return jsonify({"status": "ok", "data": {"sunrise": s["sunrise"].isoformat(), "sunset": s["sunset"].isoformat()}})
+    return jsonify({"status": "ok", "data": sun_payload()})
+
+
+@sun_bp.route("/table")
+def get_sun_table():
+    """Sun events for ``?start=YYYY-MM-DD&days=N`` (default: 42 days from today, max 366)."""
+    try:
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if "start" in request.args else date.today()
+        days = int(request.args.get("days", 42))
+    except ValueError:
+        return jsonify({"status": "error", "error": "Use start=YYYY-MM-DD and an integer days"}), 400
+    if not 0 < days <= 366:
+        return jsonify({"status": "error", "error": "days must be between 1 and 366"}), 400
+    try:
+        return jsonify({"status": "ok", "data": sun_table(start, days)})
+    except Exception:
+        logging.exception("Error computing sun table")
+        return jsonify({"status": "error", "error": "Error computing sun table"}), 500
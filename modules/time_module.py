@@ -1,12 +1,18 @@
 from flask import Blueprint, jsonify
 from datetime import datetime
+import time
 
 time_bp = Blueprint("time", __name__, url_prefix="/api/time")
 
 
-@time_bp.route("/data")
-def get_time():
-    now_dt = datetime.now()
+def seconds_until_minute():
+    """Seconds until just past the next wall-clock minute boundary."""
+    # The small margin keeps the run from landing a hair before the boundary
+    return 60 - time.time() % 60 + 0.05
+
+
+def time_payload():
+    now_dt = datetime.now().astimezone()
     hour_24 = now_dt.hour
     minute = now_dt.minute
     second = now_dt.second
@@ -14,16 +20,33 @@ def get_time():
     ampm = "AM" if hour_24 < 12 else "PM"
     time_12 = f"{hour_12:02}:{minute:02}"
     date_str = now_dt.strftime("%Y-%m-%d")
-    return jsonify(
-        {
-            "status": "ok",
-            "data": {
-                "date": date_str,
-                "time": time_12,
-                "hour": hour_12,
-                "minute": minute,
-                "second": second,
-                "ampm": ampm,
-            },
-        }
-    )
+    return {
+        "date": date_str,
+        "time": time_12,
+        "hour": hour_12,
+        "minute": minute,
+        "second": second,
+        "ampm": ampm,
+        "tz": now_dt.tzname(),
+        "utc_offset_min": int(now_dt.utcoffset().total_seconds() // 60),
+    }
+
+
+def time_sync_payload():
+    """Server clock for NTP-style client offset estimation."""
+    now_dt = datetime.now().astimezone()
+    return {
+        "server_ms": int(now_dt.timestamp() * 1000),
+        "tz": now_dt.tzname(),
+        "utc_offset_min": int(now_dt.utcoffset().total_seconds() // 60),
+    }
+
+
+@time_bp.route("/data")
+def get_time():
+    return jsonify({"status": "ok", "data": time_payload()})
+
+
+@time_bp.route("/sync")
+def get_time_sync():
+    return jsonify({"status": "ok", "data": time_sync_payload()})
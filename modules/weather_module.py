@@ -1,84 +1,203 @@
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, Response, current_app
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 import requests
+import threading
+import logging
+import json
 import time
 import os
 
+from modules.storage import CACHE_DIR, atomic_write_json, evict
+
 weather_bp = Blueprint("weather", __name__, url_prefix="/api/weather")
 
 # Cache structure
 _WEATHER_CACHE = {}
 _TTL = 600  # seconds
+_SUB_TTL = _TTL * 3  # sub-results older than this are reported as missing
+
+# One pooled session shared by the concurrent OpenWeather calls
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather")
+_TIMEOUT = (3.05, 10)  # connect, read seconds per call
+_REFRESH_LOCK = threading.Lock()
+
+# Write-through disk copy of the raw payloads so restarts reuse the last fetch
+_DISK_DIR = CACHE_DIR / "weather"
+_DISK_KEYS = ("onecall", "air_quality", "allergen_index", "precipitation", "attempt")
+_DISK_MAX_AGE = 24 * 3600  # seconds
+_DISK_MAX_BYTES = 2 * 1024 * 1024
+_MIN_ATTEMPT_INTERVAL = 60  # seconds between upstream fetches, even across restarts
+_DISK_LOADED = False
+
+
+def _persist(key):
+    try:
+        atomic_write_json(
+            _DISK_DIR / f"{key}.json",
+            {"timestamp": _WEATHER_CACHE[f"{key}_timestamp"], "value": _WEATHER_CACHE.get(key)},
+        )
+    except OSError:
+        logging.exception(f"Error writing weather cache for {key}")
+
+
+def _load_disk_cache():
+    """
+    Loads the last persisted payloads (once per process) for keys that are not
+    already in memory, after evicting anything too old or over the size cap.
+    """
+    global _DISK_LOADED
+    _DISK_LOADED = True
+    evict(_DISK_DIR, max_age=_DISK_MAX_AGE, max_bytes=_DISK_MAX_BYTES, pattern="*.json")
+    for key in _DISK_KEYS:
+        path = _DISK_DIR / f"{key}.json"
+        if key in _WEATHER_CACHE or not path.exists():
+            continue
+        try:
+            entry = json.loads(path.read_text())
+        except (OSError, ValueError):
+            logging.exception(f"Error reading weather cache for {key}")
+            continue
+        _WEATHER_CACHE[key] = entry.get("value")
+        _WEATHER_CACHE[f"{key}_timestamp"] = entry.get("timestamp", 0)
+
+
+def _get_json(url):
+    resp = _SESSION.get(url, timeout=_TIMEOUT)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _first_aqi(data):
+    return data.get("list", [{}])[0].get("main", {}).get("aqi")
 
 
 def fetch_and_cache_weather():
     """
-    Fetches weather, air quality, and pollen data, and caches them.
+    Fetches weather, air quality, pollen and precipitation concurrently and
+    caches each result with its own timestamp. A failed call keeps the
+    previous value for its key.
     """
     api_key = os.getenv("OPENWEATHER_API_KEY")
     lat = os.getenv("LATITUDE")
     lon = os.getenv("LONGITUDE")
-    # One Call 3.0: get current, hourly, daily in one call
-    resp = requests.get(
-        f"https://api.openweathermap.org/data/3.0/onecall?lat={lat}&lon={lon}&appid={api_key}&units=metric"
-    )
-    data = resp.json()
+    base = "https://api.openweathermap.org/data"
+    # Record the attempt first so a crash loop can't hammer the API
+    _WEATHER_CACHE["attempt"] = None
+    _WEATHER_CACHE["attempt_timestamp"] = time.time()
+    _persist("attempt")
+    calls = {
+        # One Call 3.0: get current, hourly, daily in one call
+        "onecall": (f"{base}/3.0/onecall?lat={lat}&lon={lon}&appid={api_key}&units=metric", lambda d: d),
+        # Air quality (if available)
+        "air_quality": (f"{base}/2.5/air_pollution?lat={lat}&lon={lon}&appid={api_key}", _first_aqi),
+        # Allergen index (OpenWeather pollen API, if available)
+        "allergen_index": (f"{base}/2.5/air_pollution/pollen?lat={lat}&lon={lon}&appid={api_key}", _first_aqi),
+        # Precipitation (if available)
+        "precipitation": (
+            f"{base}/2.5/onecall?lat={lat}&lon={lon}&appid={api_key}&exclude=hourly,daily",
+            lambda d: d.get("current", {}).get("precipitation", 0),
+        ),
+    }
+    futures = {key: _EXECUTOR.submit(_get_json, url) for key, (url, _) in calls.items()}
+    for key, future in futures.items():
+        try:
+            value = calls[key][1](future.result())
+        except Exception as e:
+            logging.warning(f"OpenWeather {key} fetch failed: {e}")
+            continue
+        _WEATHER_CACHE[key] = value
+        _WEATHER_CACHE[f"{key}_timestamp"] = time.time()
+        _persist(key)
+    evict(_DISK_DIR, max_bytes=_DISK_MAX_BYTES, pattern="*.json")
+
+
+def _refresh_in_background():
+    # Single-flight: skip if a refresh is already running
+    if not _REFRESH_LOCK.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            fetch_and_cache_weather()
+        except Exception:
+            logging.exception("Error refreshing weather")
+        finally:
+            _REFRESH_LOCK.release()
+
+    threading.Thread(target=run, name="weather-refresh", daemon=True).start()
+
+
+def _throttled():
+    return time.time() - _WEATHER_CACHE.get("attempt_timestamp", 0) < _MIN_ATTEMPT_INTERVAL
+
+
+def _ensure_weather():
+    """
+    Stale-while-revalidate: serve the cached onecall immediately and refresh
+    it in the background once the TTL expires. Only the very first load blocks,
+    and upstream is never hit more often than _MIN_ATTEMPT_INTERVAL.
+    """
+    if not _DISK_LOADED:
+        _load_disk_cache()
     now = time.time()
-    _WEATHER_CACHE["onecall"] = data
-    _WEATHER_CACHE["onecall_timestamp"] = now
-    # Air quality (if available)
-    try:
-        aq_resp = requests.get(
-            f"https://api.openweathermap.org/data/2.5/air_pollution?lat={lat}&lon={lon}&appid={api_key}"
-        )
-        aq_data = aq_resp.json()
-        _WEATHER_CACHE["air_quality"] = (
-            aq_data.get("list", [{}])[0].get("main", {}).get("aqi")
-        )
-    except Exception:
-        _WEATHER_CACHE["air_quality"] = None
-    # Allergen index (OpenWeather pollen API, if available)
-    try:
-        pollen_resp = requests.get(
-            f"https://api.openweathermap.org/data/2.5/air_pollution/pollen?lat={lat}&lon={lon}&appid={api_key}"
-        )
-        pollen_data = pollen_resp.json()
-        _WEATHER_CACHE["allergen_index"] = (
-            pollen_data.get("list", [{}])[0].get("main", {}).get("aqi")
-        )
-    except Exception:
-        _WEATHER_CACHE["allergen_index"] = None
-    # Precipitation (if available)
-    try:
-        precip_resp = requests.get(
-            f"https://api.openweathermap.org/data/2.5/onecall?lat={lat}&lon={lon}&appid={api_key}&exclude=hourly,daily"
-        )
-        precip_data = precip_resp.json()
-        _WEATHER_CACHE["precipitation"] = precip_data.get("current", {}).get(
-            "precipitation", 0
-        )
-    except Exception:
-        _WEATHER_CACHE["precipitation"] = None
+    if "onecall" not in _WEATHER_CACHE and not _throttled():
+        with _REFRESH_LOCK:
+            # Re-check: the caller we waited on may have just fetched, or failed
+            if "onecall" not in _WEATHER_CACHE and not _throttled():
+                fetch_and_cache_weather()
+    elif now - _WEATHER_CACHE.get("onecall_timestamp", 0) > _TTL and not _throttled():
+        _refresh_in_background()
+    return _WEATHER_CACHE.get("onecall", {})
+
+
+def invalidate_weather():
+    """
+    Marks the cached weather as expired so the next read triggers a refresh,
+    while the last good payload keeps being served until it lands. A manual
+    reload also bypasses the attempt throttle.
+    """
+    _WEATHER_CACHE.pop("attempt_timestamp", None)
+    if "onecall" in _WEATHER_CACHE:
+        _WEATHER_CACHE["onecall_timestamp"] = 0
+
+
+def _sub_result(key):
+    """Cached sub-result, or None once it is older than _SUB_TTL."""
+    if time.time() - _WEATHER_CACHE.get(f"{key}_timestamp", 0) > _SUB_TTL:
+        return None
+    return _WEATHER_CACHE.get(key)
 
 
 def c_to_f(c):
     return c * 9.0 / 5.0 + 32 if c is not None else None
 
 
-@weather_bp.route("/data")
-def get_weather():
-    now = time.time()
-    if (
-        "onecall" not in _WEATHER_CACHE
-        or now - _WEATHER_CACHE.get("onecall_timestamp", 0) > _TTL
-    ):
-        fetch_and_cache_weather()
-    data = _WEATHER_CACHE["onecall"]
+def _cached_view(name, key, build):
+    """
+    Returns (payload, encoded_body) for a derived view, rebuilding it only when
+    ``key`` (the upstream fetch timestamps) changes. Cached payloads are shared
+    and must not be mutated by callers.
+    """
+    views = _WEATHER_CACHE.setdefault("views", {})
+    cached = views.get(name)
+    if cached is None or cached[0] != key:
+        payload = build()
+        body = json.dumps({"status": "ok", "data": payload}).encode()
+        cached = (key, payload, body)
+        views[name] = cached
+    return cached[1], cached[2]
+
+
+def _build_current(data):
     current = data.get("current", {})
     weather = current.get("weather", [{}])[0]
     moon_phase = (
         data.get("daily", [{}])[0].get("moon_phase") if data.get("daily") else None
     )
-    _WEATHER_CACHE["data"] = {
+    return {
         "temp": c_to_f(current.get("temp")),
         "icon": weather.get("icon"),
         "description": weather.get("description"),
@@ -94,29 +213,39 @@ def get_weather():
         "uvi": current.get("uvi"),
         "sunrise": current.get("sunrise"),
         "sunset": current.get("sunset"),
-        "air_quality": _WEATHER_CACHE.get("air_quality"),
-        "allergen_index": _WEATHER_CACHE.get("allergen_index"),
+        "air_quality": _sub_result("air_quality"),
+        "allergen_index": _sub_result("allergen_index"),
         "moon_phase": moon_phase,
         "pressure": current.get("pressure"),
         "clouds": current.get("clouds"),
         "feels_like": c_to_f(current.get("feels_like")),
         "dew_point": c_to_f(current.get("dew_point")),
     }
-    return jsonify({"status": "ok", "data": _WEATHER_CACHE["data"]})
 
 
-@weather_bp.route("/forecast")
-def get_forecast():
+def _current_view():
+    data = _ensure_weather()
+    key = (
+        _WEATHER_CACHE.get("onecall_timestamp"),
+        _sub_result("air_quality"),
+        _sub_result("allergen_index"),
+    )
+    return _cached_view("current", key, lambda: _build_current(data))
+
+
+def weather_payload():
     """
-    Returns hourly (next 24h) and daily (next 5d) forecast for modal overlay.
+    Returns the current-conditions payload, refreshing the cache if expired.
     """
-    now = time.time()
-    if (
-        "onecall" not in _WEATHER_CACHE
-        or now - _WEATHER_CACHE.get("onecall_timestamp", 0) > _TTL
-    ):
-        fetch_and_cache_weather()
-    data = _WEATHER_CACHE["onecall"]
+    return _current_view()[0]
+
+
+@weather_bp.route("/data")
+def get_weather():
+    return Response(_current_view()[1], mimetype="application/json")
+
+
+def _build_forecast(data):
     # Hourly: next 24h
     hourly = []
     for h in data.get("hourly", [])[:24]:
@@ -129,36 +258,42 @@ def get_forecast():
                 "pop": h.get("pop"),
             }
         )
-    # Daily
+    # Daily: convert copies so the cached onecall stays in Celsius
     daily = []
     for d in data.get("daily", []):
-        d["temp"]["day"] = c_to_f(d["temp"]["day"])
-        d["temp"]["night"] = c_to_f(d["temp"]["night"])
-        d["temp"]["eve"] = c_to_f(d["temp"]["eve"])
-        d["temp"]["morn"] = c_to_f(d["temp"]["morn"])
-        d["temp"]["min"] = c_to_f(d["temp"]["min"])
-        d["temp"]["max"] = c_to_f(d["temp"]["max"])
-
-        d["feels_like"]["day"] = c_to_f(d["feels_like"]["day"])
-        d["feels_like"]["night"] = c_to_f(d["feels_like"]["night"])
-        d["feels_like"]["eve"] = c_to_f(d["feels_like"]["eve"])
-        d["feels_like"]["morn"] = c_to_f(d["feels_like"]["morn"])
-        d["dew_point"] = c_to_f(d["dew_point"])
+        full = dict(d)
+        full["temp"] = {k: c_to_f(v) for k, v in d["temp"].items()}
+        full["feels_like"] = {k: c_to_f(v) for k, v in d["feels_like"].items()}
+        full["dew_point"] = c_to_f(d["dew_point"])
         daily.append(
             {
                 "dt": d["dt"],
-                "temp_high": d["temp"]["max"],
-                "temp_low": d["temp"]["min"],
+                "temp_high": full["temp"]["max"],
+                "temp_low": full["temp"]["min"],
                 "icon": d["weather"][0]["icon"],
                 "description": d["weather"][0]["description"],
-                "full_data": d,
+                "full_data": full,
             }
         )
-    forecast = {
+    return {
         "hourly": hourly,
         "daily": daily,
         "location": data.get("timezone", "Unknown"),
     }
-    _WEATHER_CACHE["forecast"] = forecast
-    _WEATHER_CACHE["forecast_timestamp"] = now
-    return jsonify({"status": "ok", "data": forecast})
+
+
+def _forecast_view():
+    data = _ensure_weather()
+    return _cached_view("forecast", _WEATHER_CACHE.get("onecall_timestamp"), lambda: _build_forecast(data))
+
+
+def forecast_payload():
+    """
+    Returns hourly (next 24h) and daily (next 5d) forecast for modal overlay.
+    """
+    return _forecast_view()[0]
+
+
+@weather_bp.route("/forecast")
+def get_forecast():
+    return Response(_forecast_view()[1], mimetype="application/json")
@@ -210,12 +210,12 @@ function renderClockModal() {
 
 function startAnalogClock() {
   updateAnalogTime();
-  clockInterval = setInterval(updateAnalogTime, 1000);
+  clockInterval = tickOnBoundary(1000, updateAnalogTime);
 }
 
 function stopAnalogClock() {
   if (clockInterval) {
-    clearInterval(clockInterval);
+    clockInterval();
     clockInterval = null;
   }
 }
@@ -224,7 +224,7 @@ function updateAnalogTime() {
   const overlay = document.getElementById("clock-modal-overlay");
   const hourHand = overlay.querySelector(".clock-hand.hour");
   if (!hourHand) return;
-  const now = new Date();
+  const now = serverNow();
   const sec = now.getSeconds();
   const min = now.getMinutes() + sec / 60;
 
@@ -301,7 +301,7 @@ function saveSchedule(s) {
 }
 
 function getAnalogClockHtml(style) {
-  const dateStr = new Date().toLocaleDateString(undefined, {
+  const dateStr = serverNow().toLocaleDateString(undefined, {
     weekday: "long",
     month: "long",
     day: "numeric",
@@ -415,7 +415,7 @@ function getDigitalClockHtml(style) {
     </div>`;
   }
 
-  const dateStr = new Date().toLocaleDateString(undefined, {
+  const dateStr = serverNow().toLocaleDateString(undefined, {
     weekday: "long",
     month: "long",
     day: "numeric",
@@ -438,16 +438,16 @@ function startDigitalClock(style) {
   if (style === "words") {
     setupWordClock();
     updateWordClock();
-    clockInterval = setInterval(updateWordClock, 60000);
+    clockInterval = tickOnBoundary(60000, updateWordClock);
   } else {
     updateDigitalTime();
-    clockInterval = setInterval(updateDigitalTime, 1000);
+    clockInterval = tickOnBoundary(1000, updateDigitalTime);
   }
 }
 
 function stopDigitalClock() {
   if (clockInterval) {
-    clearInterval(clockInterval);
+    clockInterval();
     clockInterval = null;
   }
 }
@@ -502,7 +502,7 @@ function updateDigitalTime() {
   const overlay = document.getElementById("clock-modal-overlay");
   const timeEl = overlay.querySelector(".digital-time");
   if (!timeEl || currentDigitalStyle === "words") return;
-  const now = new Date();
+  const now = serverNow();
   const hr12 = now.getHours() % 12 || 12;
   const min = now.getMinutes();
   const sec = now.getSeconds();
@@ -619,7 +619,7 @@ function updateWordClock() {
   const grid = overlay.querySelector(".wordclock-grid");
   if (!grid) return;
   clearWordClock();
-  const now = new Date();
+  const now = serverNow();
   const words = getWordClockWords(now);
   words.forEach(highlightWord);
 
@@ -682,23 +682,23 @@ function startWorldClock() {
     addingLocation = false;
     addBtn.textContent = 'Add Location';
   });
-  worldClockInterval = setInterval(() => {
+  worldClockInterval = tickOnBoundary(60000, () => {
     drawWorldMap();
     updateWorldTimes();
-  }, 60000);
+  });
   drawWorldMap();
   updateWorldTimes();
 }
 
 function stopWorldClock() {
   if (worldClockInterval) {
-    clearInterval(worldClockInterval);
+    worldClockInterval();
     worldClockInterval = null;
   }
 }
 
 function timeAtLocation(lat, lon) {
-  const now = new Date();
+  const now = new Date(Date.now() + serverTimeOffset);
   const utc = now.getTime() + now.getTimezoneOffset() * 60000;
   const offsetMs = (lon / 15) * 3600000;
   return new Date(utc + offsetMs);
@@ -730,7 +730,7 @@ function drawWorldMap() {
     ctx.fillRect((i/24)*w,0,w/24,h);
   }
   // day/night overlay
-  const now = new Date();
+  const now = new Date(Date.now() + serverTimeOffset);
   const sunLon = ((now.getUTCHours() + now.getUTCMinutes()/60)/24)*360 - 180;
   for(let x=0;x<w;x++){
     const lon = (x/w)*360 - 180;
@@ -11,6 +11,10 @@ const defaultPrefs = {
 let prefs = loadPrefs();
 let lastSunData = null;
 let lastIcloudData = null;
+let icloudVersion = null;
+// Server clock minus local clock (ms), and the server's UTC offset (minutes)
+let serverTimeOffset = 0;
+let serverUtcOffsetMin = null;
 const calendarsData = [
   { name: "Home" },
   { name: "Work" },
@@ -95,16 +99,45 @@ document.addEventListener("DOMContentLoaded", () => {
   }
 
   socket.on("weather_update", (data) => updateWeather(data));
-  socket.on("time_update", (data) => updateTime(data));
+  socket.on("time_update", (data) => {
+    serverUtcOffsetMin = data.utc_offset_min;
+    updateTime(data);
+  });
+  socket.on("connect", () => syncServerClock(socket));
+  setInterval(() => syncServerClock(socket), 10 * 60 * 1000);
+  // The server pushes only at minute rollover; seconds tick locally
+  tickOnBoundary(1000, () => updateTime(localTimeData()));
   socket.on("network_update", (data) => updateNetwork(data));
   socket.on("lighting_update", (data) => updateLighting(data));
   socket.on("sun_update", (data) => updateSunTheme(data));
-  socket.on("icloud_update", (data) => {
+  socket.on("icloud_update", (msg) => {
+    icloudVersion = msg.version;
+    if (!msg.data) return;
+    lastIcloudData = msg.data;
+    updateIcloudWeekView(msg.data);
+    updateIcloudMonthView(msg.data);
+    updateChecklists(msg.data);
+    // updateIcloudPhotos(msg.data);
+  });
+  socket.on("meals_patch", (patch) => applyMealsPatch(patch));
+  // Meal edits made while disconnected were missed; reload the grid
+  socket.io.on("reconnect", () => fetchAndRenderMealsMonthView());
+  socket.on("icloud_patch", (patch) => {
+    // Patches only apply on top of the version they were diffed against
+    if (patch.base !== icloudVersion || !lastIcloudData) {
+      socket.emit("icloud_resync", { version: icloudVersion });
+      return;
+    }
+    const { data, changed } = applyIcloudPatch(lastIcloudData, patch.ops);
     lastIcloudData = data;
-    updateIcloudWeekView(data);
-    updateIcloudMonthView(data);
-    updateChecklists(data);
-    // updateIcloudPhotos(data);
+    icloudVersion = patch.version;
+    if (changed.has("events")) {
+      updateIcloudWeekView(data);
+      updateIcloudMonthView(data);
+    }
+    if (["today", "tasks", "shopping", "chores"].some((f) => changed.has(f))) {
+      updateChecklists(data);
+    }
   });
 
   // Initial fetch in case events arrived before socket connected
@@ -144,6 +177,33 @@ document.addEventListener("DOMContentLoaded", () => {
   moveWidgetsToFooter();
 });
 
+// Apply JSON-patch style ops from the server; list items are addressed by uid
+function applyIcloudPatch(data, ops) {
+  const next = { ...data };
+  const changed = new Set();
+  const unescape = (p) => p.replace(/~1/g, "/").replace(/~0/g, "~");
+  ops.forEach((op) => {
+    const [field, uid] = op.path.split("/").slice(1).map(unescape);
+    changed.add(field);
+    if (uid === undefined) {
+      if (op.op === "remove") delete next[field];
+      else next[field] = op.value;
+      return;
+    }
+    const list = next[field] === data[field] ? [...(data[field] || [])] : next[field];
+    const idx = list.findIndex((item) => item.uid === uid);
+    if (op.op === "remove") {
+      if (idx !== -1) list.splice(idx, 1);
+    } else if (idx !== -1) {
+      list[idx] = op.value;
+    } else {
+      list.push(op.value);
+    }
+    next[field] = list;
+  });
+  return { data: next, changed };
+}
+
 // Helper: format unix timestamp to local time
 function formatTime(ts) {
   if (!ts) return "--";
@@ -191,6 +251,48 @@ function moveWidgetsToFooter() {
   if (network) footer.appendChild(network);
 }
 
+// Estimates serverTimeOffset from one round trip, assuming symmetric latency
+function syncServerClock(socket) {
+  const t0 = Date.now();
+  socket.emit("time_sync", { t0 }, (reply) => {
+    const t1 = Date.now();
+    serverTimeOffset = reply.server_ms + (t1 - t0) / 2 - t1;
+    serverUtcOffsetMin = reply.utc_offset_min;
+  });
+}
+
+// Current server time as a Date whose local getters read the server's wall clock
+function serverNow() {
+  const now = new Date(Date.now() + serverTimeOffset);
+  if (serverUtcOffsetMin === null) return now;
+  return new Date(now.getTime() + (serverUtcOffsetMin + now.getTimezoneOffset()) * 60000);
+}
+
+// Calls fn on every period boundary of the server clock; returns a function that stops it
+function tickOnBoundary(periodMs, fn) {
+  let timer = null;
+  const schedule = () => {
+    const now = Date.now() + serverTimeOffset;
+    timer = setTimeout(() => {
+      fn();
+      schedule();
+    }, periodMs - (now % periodMs) + 5);
+  };
+  schedule();
+  return () => clearTimeout(timer);
+}
+
+// Same shape as the server's time payload, built from the synced clock
+function localTimeData() {
+  const now = serverNow();
+  const hour = now.getHours() % 12 || 12;
+  return {
+    time: `${String(hour).padStart(2, "0")}:${String(now.getMinutes()).padStart(2, "0")}`,
+    second: now.getSeconds(),
+    ampm: now.getHours() < 12 ? "AM" : "PM",
+  };
+}
+
 function updateTime(data) {
   const c = document.getElementById("clock");
   // Build the AM/PM label (vertical, only show the correct one)
@@ -212,16 +314,25 @@ function updateTime(data) {
 function updateNetwork(data) {
   const n = document.getElementById("network-status");
   const isOnline = data.network === "online";
-  const iconClass = isOnline
-    ? "network-icon network-online"
-    : "network-icon network-offline";
-  const label = isOnline ? "Online" : "Offline";
+  // "unknown" until the first probe round finishes
+  const isOffline = data.network === "offline";
+  const iconClass = isOffline
+    ? "network-icon network-offline"
+    : "network-icon network-online";
+  const label = isOnline ? "Online" : isOffline ? "Offline" : "Checking";
   n.innerHTML =
     `<span class="${iconClass}">` +
-    (isOnline ? "&#9679;" : "&#10006;") +
+    (isOffline ? "&#10006;" : "&#9679;") +
     `</span><span class="network-label">${label}</span>`;
+  // Latency only comes from /api/network/data; pushes keep the last tooltip
+  if ("avg_latency_ms" in data) {
+    n.title =
+      data.avg_latency_ms != null
+        ? `Latency ${data.avg_latency_ms} ms, loss ${data.loss_pct}%`
+        : "";
+  }
   const offline = document.getElementById("offline-indicator");
-  if (!isOnline) {
+  if (isOffline) {
     offline.classList.remove("hidden");
   } else {
     offline.classList.add("hidden");
@@ -237,7 +348,9 @@ function updateSunTheme(data) {
   const now = new Date();
   const sunrise = new Date(data.sunrise);
   const sunset = new Date(data.sunset);
-  let theme = now >= sunrise && now < sunset ? "light" : "dark";
+  // The server pushes sun_update at each transition with the current phase
+  const isDay = data.phase ? data.phase === "day" : now >= sunrise && now < sunset;
+  let theme = isDay ? "light" : "dark";
   if (prefs.theme !== "auto") theme = prefs.theme;
   document.body.classList.toggle("light-mode", theme === "light");
   document.body.classList.toggle("dark-mode", theme === "dark");
@@ -34,12 +34,26 @@ function updateFavoriteStar() {
   const resultsContainer = document.getElementById("spoonacular-results");
   if (!searchInput || !searchBtn || !resultsContainer) return;
 
-  function renderResults(results) {
+  function renderResults(results, local) {
     resultsContainer.innerHTML = '';
-    if (!results || !results.length) {
+    if (!results.length && !local.length) {
       resultsContainer.innerHTML = '<div class="no-results">No results found.</div>';
       return;
     }
+    // Saved recipes matching the query come first
+    local.forEach(r => {
+      const card = document.createElement('div');
+      card.className = 'spoonacular-result-card saved-result-card';
+      card.innerHTML = `
+        <span class="material-symbols-outlined result-thumb">bookmark</span>
+        <span class="result-title">${r.title}</span>
+        <button type="button" class="spoonacular-import-btn" data-uuid="${r.uuid}">
+          <span class="material-symbols-outlined">content_copy</span>
+          <span>Use</span>
+        </button>
+      `;
+      resultsContainer.appendChild(card);
+    });
     results.forEach(r => {
       const card = document.createElement('div');
       card.className = 'spoonacular-result-card';
@@ -61,7 +75,7 @@ function updateFavoriteStar() {
     resultsContainer.innerHTML = '<div>Searching...</div>';
     fetch(`/api/meals/search?query=${encodeURIComponent(q)}`)
       .then(r => r.json())
-      .then(data => renderResults(data.results || []))
+      .then(data => renderResults(data.results || [], data.local || []))
       .catch(() => { resultsContainer.innerHTML = '<div style="color:red;">Error searching recipes.</div>'; });
   }
 
@@ -79,10 +93,14 @@ function updateFavoriteStar() {
     const btn = e.target.closest('.spoonacular-import-btn');
     if (!btn) return;
     const id = btn.getAttribute('data-id');
-    if (!id) return;
+    const savedUuid = btn.getAttribute('data-uuid');
+    if (!id && !savedUuid) return;
     btn.disabled = true;
-    btn.textContent = 'Importing...';
-    fetch(`/api/meals/recipe?id=${encodeURIComponent(id)}`)
+    btn.textContent = savedUuid ? 'Loading...' : 'Importing...';
+    const url = savedUuid
+      ? `/api/recipes/${encodeURIComponent(savedUuid)}`
+      : `/api/meals/recipe?id=${encodeURIComponent(id)}`;
+    fetch(url)
       .then(r => r.json())
       .then(obj => {
         // Fill modal fields
@@ -103,7 +121,7 @@ function updateFavoriteStar() {
       })
       .finally(() => {
         btn.disabled = false;
-        btn.textContent = 'Import';
+        btn.textContent = savedUuid ? 'Use' : 'Import';
       });
   });
 })();
@@ -136,13 +154,13 @@ function shuffleMealPlan() {
           const meal = mealsData[month][date][mealType];
           const key = `${date}|${mealType}`;
           const locked = window.mealSlotLocks && window.mealSlotLocks[key];
-          if (!locked && (!meal || !meal.title)) {
+          if (!locked && (!meal || !meal.recipe_uuid)) {
             slotsToFill.push({ month, date, mealType });
-          } else if (meal && meal.title) {
-            // Track assigned titles for week
+          } else if (meal && meal.recipe_uuid) {
+            // Track assigned recipes for week
             const weekKey = getWeekKey(date);
             if (!assignedTitlesByWeek[weekKey]) assignedTitlesByWeek[weekKey] = new Set();
-            assignedTitlesByWeek[weekKey].add(meal.title);
+            assignedTitlesByWeek[weekKey].add(meal.recipe_uuid);
           }
         });
       });
@@ -154,24 +172,21 @@ function shuffleMealPlan() {
     slotsToFill.forEach(slot => {
       const weekKey = getWeekKey(slot.date);
       if (!assignedTitlesByWeek[weekKey]) assignedTitlesByWeek[weekKey] = new Set();
-      // Find a favorite not used in this week
-      const pick = shuffled.find(fav => !assignedTitlesByWeek[weekKey].has(fav.title));
+      // Find a favorite not used in this week (favorites are [uuid, title] pairs)
+      const pick = shuffled.find(([uuid]) => !assignedTitlesByWeek[weekKey].has(uuid));
       if (pick) {
-        assignedTitlesByWeek[weekKey].add(pick.title);
-        updates.push({ ...slot, recipe: pick });
+        assignedTitlesByWeek[weekKey].add(pick[0]);
+        updates.push({ op: 'set', date: slot.date, mealType: slot.mealType, recipe_uuid: pick[0] });
       }
     });
-    // POST updates sequentially
-    (async function postUpdates() {
-      for (const upd of updates) {
-        await fetch('/api/meals/update', {
-          method: 'POST',
-          headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify(upd)
-        });
-      }
-      fetchAndRenderMealsMonthView();
-    })();
+    if (updates.length === 0) return;
+    // Apply every assignment in one transaction
+    fetch('/api/meals/bulk', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ops: updates })
+    });
+    // The grid is updated by the meals_patch event the server pushes
   });
 }
 
@@ -369,7 +384,7 @@ function shuffleMealPlan() {
     })
       .then((r) => r.json())
       .then(() => {
-        fetchAndRenderMealsMonthView();
+        // The grid itself is patched by the pushed meals_patch event
         fetchHistory();
         fetchFavorites();
       });
@@ -523,6 +538,11 @@ function shuffleMealPlan() {
     fetchFavorites(); // This will eventually call renderFavorites, which calls makeRecipeItemsDraggable
   };
 
+  window.refreshMealsSidePanel = function () {
+    fetchFavorites();
+    fetchHistory();
+  };
+
   // Initial load if panel is visible
   if (mealsPanelWrapper && !mealsPanelWrapper.classList.contains("hidden")) {
     fetchFavorites(); // This will eventually call renderFavorites, which calls makeRecipeItemsDraggable
@@ -680,7 +700,6 @@ function shuffleMealPlan() {
         throw new Error(err.error || "Failed to save recipe");
       }
       hideModal();
-      fetchAndRenderMealsMonthView();
     } catch (err) {
       alert("Error saving recipe: " + err.message);
     }
@@ -713,7 +732,7 @@ function patchMealSlotClicksWithModal(mealsData, recipeMap) {
 }
 
 // --- Ensure all helpers and functions are defined in global scope ---
-function renderMealsMonthView(data) {
+function renderMealsMonthView(data, embeddedRecipes) {
   const mealsViewContainer = document.getElementById("meals-view-container");
   if (!mealsViewContainer) return;
   // Use current month and year
@@ -746,7 +765,7 @@ function renderMealsMonthView(data) {
   for (let i = 0; i < 42; i++) {
     const cellDate = new Date(gridStartDate);
     cellDate.setDate(gridStartDate.getDate() + i);
-    const dateStr = cellDate.toISOString().split("T")[0];
+    const dateStr = localDateStr(cellDate);
     const monthStr = `${cellDate.getFullYear()}-${String(cellDate.getMonth() + 1).padStart(2, "0")}`;
     const dayMeals = (mealsData[monthStr] && mealsData[monthStr][dateStr]) || {};
     ["breakfast", "lunch", "dinner"].forEach((mealType) => {
@@ -759,25 +778,28 @@ function renderMealsMonthView(data) {
   const recipeUuids = Array.from(recipeUuidSet);
 
   // --- Fetch all recipes in parallel, then render grid ---
-  if (recipeUuids.length === 0) {
+  if (embeddedRecipes) {
+    // Recipes came along with the meals payload
+    renderGrid(embeddedRecipes);
+    if (window.onMealsGridRendered) {
+      window.onMealsGridRendered(data, embeddedRecipes);
+    }
+  } else if (recipeUuids.length === 0) {
     // No recipes, render with default titles
     renderGrid({});
     if (window.onMealsGridRendered) {
       window.onMealsGridRendered(data, {}); // Pass the original mealsData
     }
   } else {
-    Promise.all(
-      recipeUuids.map(uuid => fetch(`/api/recipes/${uuid}`).then(r => r.ok ? r.json() : null))
-    ).then(recipeObjs => {
-      const recipeMap = {};
-      recipeObjs.forEach((rec, idx) => {
-        if (rec && rec.uuid) recipeMap[rec.uuid] = rec;
+    // One batch request for every recipe in the grid (ETag-validated)
+    fetch(`/api/recipes/batch?uuids=${recipeUuids.map(encodeURIComponent).join(",")}`)
+      .then(r => r.ok ? r.json() : {})
+      .then(recipeMap => {
+        renderGrid(recipeMap);
+        if (window.onMealsGridRendered) {
+          window.onMealsGridRendered(data, recipeMap); // Pass the original mealsData
+        }
       });
-      renderGrid(recipeMap);
-      if (window.onMealsGridRendered) {
-        window.onMealsGridRendered(data, recipeMap); // Pass the original mealsData
-      }
-    });
   }
 
   function renderGrid(recipeMap) {
@@ -796,7 +818,7 @@ function renderMealsMonthView(data) {
         cellDate.getDate() === todayDate
       )
         cellClasses += " today";
-      const dateStr = cellDate.toISOString().split("T")[0];
+      const dateStr = localDateStr(cellDate);
       const monthStr = `${cellDate.getFullYear()}-${String(cellDate.getMonth() + 1).padStart(2, "0")}`;
       const dayMeals = (mealsData[monthStr] && mealsData[monthStr][dateStr]) || {};
       mealsGridHtml += `<div class="${cellClasses}" data-date="${dateStr}">`;
@@ -886,11 +908,83 @@ if (typeof addTouchHandlers !== 'function') {
   function addTouchHandlers() {}
 }
 
+// Meals and recipes behind the rendered grid; meals_patch events update them in place
+let mealsGridState = { meals: {}, recipes: {} };
+
+function updateMealSlotElement(date, mealType, slot) {
+  const el = document.querySelector(
+    `.meal-slot[data-date="${date}"][data-meal-type="${mealType}"]`
+  );
+  if (!el) return; // Not in the visible grid
+  const recipe = slot && slot.recipe_uuid && mealsGridState.recipes[slot.recipe_uuid];
+  const titleEl = el.querySelector(".meal-slot-title");
+  el.dataset.recipeUuid = slot ? slot.recipe_uuid : "";
+  el.classList.toggle("empty-meal-slot", !slot);
+  if (titleEl) titleEl.textContent = (recipe && recipe.title) || "+";
+}
+
+// Applies a pushed {slots: [{date, meal_type, slot}], recipes: [{uuid, recipe}]} change
+function applyMealsPatch(patch) {
+  const { meals, recipes } = mealsGridState;
+  (patch.recipes || []).forEach(({ uuid, recipe }) => {
+    if (recipe) recipes[uuid] = recipe;
+    else delete recipes[uuid];
+  });
+  const missing = new Set();
+  (patch.slots || []).forEach(({ date, meal_type, slot }) => {
+    const month = date.slice(0, 7);
+    if (slot) {
+      meals[month] = meals[month] || {};
+      meals[month][date] = meals[month][date] || {};
+      meals[month][date][meal_type] = slot;
+      if (slot.recipe_uuid && !recipes[slot.recipe_uuid]) missing.add(slot.recipe_uuid);
+    } else if (meals[month] && meals[month][date]) {
+      delete meals[month][date][meal_type];
+    }
+  });
+  const ready = missing.size
+    ? fetch(`/api/recipes/batch?uuids=${Array.from(missing).map(encodeURIComponent).join(",")}`)
+        .then((r) => (r.ok ? r.json() : {}))
+        .then((found) => Object.assign(recipes, found))
+    : Promise.resolve();
+  ready.then(() => {
+    (patch.slots || []).forEach(({ date, meal_type, slot }) =>
+      updateMealSlotElement(date, meal_type, slot)
+    );
+    // Renamed or deleted recipes change every slot showing them
+    (patch.recipes || []).forEach(({ uuid }) => {
+      document.querySelectorAll(`.meal-slot[data-recipe-uuid="${uuid}"]`).forEach((el) => {
+        const titleEl = el.querySelector(".meal-slot-title");
+        if (titleEl) titleEl.textContent = (recipes[uuid] && recipes[uuid].title) || "+";
+      });
+    });
+    if ((patch.recipes || []).length && window.refreshMealsSidePanel) {
+      window.refreshMealsSidePanel();
+    }
+  });
+}
+
+// YYYY-MM-DD from local date fields (toISOString() would shift it to UTC)
+function localDateStr(d) {
+  return `${d.getFullYear()}-${String(d.getMonth() + 1).padStart(2, "0")}-${String(d.getDate()).padStart(2, "0")}`;
+}
+
 // --- Ensure fetchAndRenderMealsMonthView is defined globally ---
 function fetchAndRenderMealsMonthView() {
-  fetch("/api/meals/data")
+  // Only request the 42 days shown in the grid, with their recipes embedded
+  const now = new Date();
+  const gridStart = new Date(now.getFullYear(), now.getMonth(), 1);
+  gridStart.setDate(gridStart.getDate() - gridStart.getDay());
+  const gridEnd = new Date(gridStart);
+  gridEnd.setDate(gridStart.getDate() + 41);
+  const start = localDateStr(gridStart);
+  const end = localDateStr(gridEnd);
+  fetch(`/api/meals/data?start=${start}&end=${end}&include=recipes`)
     .then((r) => r.json())
-    .then((data) => renderMealsMonthView(data));
+    .then((payload) => {
+      mealsGridState = { meals: payload.meals, recipes: payload.recipes };
+      renderMealsMonthView(mealsGridState.meals, mealsGridState.recipes);
+    });
 }
 
 // --- Shopping List Modal Logic ---
@@ -939,24 +1033,12 @@ function fetchAndRenderMealsMonthView() {
       fetch(`/api/meals/shopping-list?start=${encodeURIComponent(start)}&end=${encodeURIComponent(end)}`)
         .then((r) => r.json())
         .then((ingredients) => {
-          // De-dupe (case-insensitive), count, and sort
-          const counts = {};
-          ingredients.forEach((item) => {
-            const key = item.trim().toLowerCase();
-            if (!key) return;
-            counts[key] = (counts[key] || 0) + 1;
-          });
-          const sorted = Object.keys(counts).sort((a, b) => a.localeCompare(b));
+          // Items arrive de-duplicated and summed; just sort by name
+          const sorted = ingredients
+            .filter((i) => i.item)
+            .sort((a, b) => a.item.localeCompare(b.item));
           listEl.innerHTML = sorted.length
-            ? sorted
-                .map((key) => {
-                  const display = ingredients.find(
-                    (i) => i.trim().toLowerCase() === key
-                  ) || key;
-                  const count = counts[key];
-                  return `<li>${display}${count > 1 ? ` <span class=\"ingredient-count\">(x${count})</span>` : ""}</li>`;
-                })
-                .join("")
+            ? sorted.map((i) => `<li>${i.text || i.item}</li>`).join("")
             : '<li>No ingredients found for this date range.</li>';
         });
     });